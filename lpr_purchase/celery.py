@@ -18,5 +18,9 @@ app.conf.beat_schedule = {
     'generate_reservation_report': {
         'task': 'lpr_purchase.tasks.generate_reservation_report',
         'schedule': crontab(minute='*/1') # TESTING: run every minute
+    },
+    'maintain_opening_hours': {
+        'task': 'resources.tasks.maintain_opening_hours',
+        'schedule': crontab(hour=3, minute=30)
     }
 }
@@ -5,17 +5,21 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 from django.contrib.gis.admin import OSMGeoAdmin
 from django.core.exceptions import ValidationError
+from django.contrib import messages
+from django.db import IntegrityError, transaction
 from django.db.models import Q
+from django.http import HttpResponseRedirect
 from django.utils.translation import ugettext_lazy as _
 from django import forms
 from guardian import admin as guardian_admin
 from image_cropping import ImageCroppingMixin
 from modeltranslation.admin import TranslationAdmin, TranslationStackedInline
 from .base import ExtraReadonlyFieldsOnUpdateMixin, CommonExcludeMixin, PopulateCreatedAndModifiedMixin
-from resources.admin.period_inline import PeriodInline
+from resources.admin.period_inline import PeriodInline, get_changed_period_dates
 from resources.models import Day, Reservation, Resource, ResourceImage, ResourceType, Unit, Purpose
 from resources.models import Equipment, ResourceEquipment, EquipmentAlias, EquipmentCategory, TermsOfUse
 from resources.models import ReservationMetadataField, ReservationMetadataSet, ResourceGroup
+from resources.models.reservation import is_reservation_overlap_error
 from lpr_purchase.models.purchase import Purchase
 
 
@@ -55,6 +59,26 @@ class HttpsFriendlyGeoAdmin(OSMGeoAdmin):
     openlayers_url = 'https://cdnjs.cloudflare.com/ajax/libs/openlayers/2.13.1/OpenLayers.js'
 
 
+class OpeningHoursUpdateMixin(object):
+    """
+    Update the materialized opening hours after the period inlines have been saved
+
+    If only periods were changed, only the days they cover are recomputed.
+    """
+    # changes to these fields affect all the opening hours of the object
+    opening_hours_fields = ()
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        obj = form.instance
+        if not change or set(form.changed_data) & set(self.opening_hours_fields):
+            obj.update_opening_hours()
+            return
+        dates = get_changed_period_dates(formsets)
+        if dates:
+            obj.update_opening_hours(*dates)
+
+
 class DayInline(admin.TabularInline):
     model = Day
 
@@ -73,7 +97,8 @@ class ResourceGroupInline(PopulateCreatedAndModifiedMixin, CommonExcludeMixin, a
     extra = 0
 
 
-class ResourceAdmin(PopulateCreatedAndModifiedMixin, CommonExcludeMixin, TranslationAdmin, HttpsFriendlyGeoAdmin):
+class ResourceAdmin(OpeningHoursUpdateMixin, PopulateCreatedAndModifiedMixin, CommonExcludeMixin, TranslationAdmin,
+                    HttpsFriendlyGeoAdmin):
     inlines = [
         PeriodInline,
         ResourceEquipmentInline,
@@ -88,14 +113,11 @@ class ResourceAdmin(PopulateCreatedAndModifiedMixin, CommonExcludeMixin, Transla
     list_filter = ('unit', 'public', 'reservable')
     list_select_related = ('unit',)
     ordering = ('unit', 'name')
-
-    def save_model(self, request, obj, form, change):
-        super().save_model(request, obj, form, change)
-        obj.update_opening_hours()
+    opening_hours_fields = ('unit',)
 
 
-class UnitAdmin(PopulateCreatedAndModifiedMixin, CommonExcludeMixin, FixedGuardedModelAdminMixin,
-                TranslationAdmin, HttpsFriendlyGeoAdmin):
+class UnitAdmin(OpeningHoursUpdateMixin, PopulateCreatedAndModifiedMixin, CommonExcludeMixin,
+                FixedGuardedModelAdminMixin, TranslationAdmin, HttpsFriendlyGeoAdmin):
     inlines = [
         PeriodInline
     ]
@@ -103,10 +125,7 @@ class UnitAdmin(PopulateCreatedAndModifiedMixin, CommonExcludeMixin, FixedGuarde
     default_lon = 2776460  # Central Railway Station in EPSG:3857
     default_lat = 8438120
     default_zoom = 12
-
-    def save_model(self, request, obj, form, change):
-        super().save_model(request, obj, form, change)
-        obj.update_opening_hours()
+    opening_hours_fields = ('time_zone',)
 
 
 class ResourceImageAdmin(PopulateCreatedAndModifiedMixin, CommonExcludeMixin, ImageCroppingMixin, TranslationAdmin):
@@ -130,8 +149,32 @@ class ResourceEquipmentAdmin(PopulateCreatedAndModifiedMixin, CommonExcludeMixin
     fields = ('resource', 'equipment', 'description', 'data')
 
 
+class ReservationAdminForm(forms.ModelForm):
+    class Meta:
+        model = Reservation
+        exclude = CommonExcludeMixin.exclude
+
+    def clean(self):
+        cleaned_data = super().clean()
+        resource = cleaned_data.get('resource')
+        begin = cleaned_data.get('begin')
+        end = cleaned_data.get('end')
+        state = cleaned_data.get('state', self.instance.state)
+        if not (resource and begin and end) or state in (Reservation.CANCELLED, Reservation.DENIED):
+            return cleaned_data
+
+        # the same rule as in the reservation overlap constraint
+        overlapping = Reservation.objects.filter(resource=resource, begin__lt=end, end__gt=begin).current()
+        if self.instance.pk:
+            overlapping = overlapping.exclude(pk=self.instance.pk)
+        if overlapping.exists():
+            raise ValidationError(_("The resource is already reserved for some of the period"))
+        return cleaned_data
+
+
 class ReservationAdmin(PopulateCreatedAndModifiedMixin, CommonExcludeMixin, ExtraReadonlyFieldsOnUpdateMixin,
                        admin.ModelAdmin):
+    form = ReservationAdminForm
     extra_readonly_fields_on_update = ('access_code', 'created_at', )
     list_display = ['resource', 'begin', 'end', 'get_status', 'get_success', 'get_failure', 'created_at']
     list_filter = ('resource', 'begin', 'end', 'created_at')
@@ -152,6 +195,18 @@ class ReservationAdmin(PopulateCreatedAndModifiedMixin, CommonExcludeMixin, Extr
     get_success.short_description = 'Success'
     get_failure.short_description = 'Failure'
 
+    def changeform_view(self, request, *args, **kwargs):
+        # A reservation saved concurrently may still violate the overlap constraint
+        # after the form validation.
+        try:
+            with transaction.atomic():
+                return super().changeform_view(request, *args, **kwargs)
+        except IntegrityError as exc:
+            if not is_reservation_overlap_error(exc):
+                raise
+            self.message_user(request, _("The resource is already reserved for some of the period"), messages.ERROR)
+            return HttpResponseRedirect(request.get_full_path())
+
 
 
 class ResourceTypeAdmin(PopulateCreatedAndModifiedMixin, CommonExcludeMixin, TranslationAdmin):
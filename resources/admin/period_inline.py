@@ -129,3 +129,29 @@ class PeriodInline(InlineModelAdmin):
             elif isinstance(obj, Resource):  # pragma: no branch
                 formset.form.base_fields.pop("unit", None)
         return formset
+
+
+def get_changed_period_dates(formsets):
+    """
+    Return the first and the last date affected by the changed periods in the formsets
+
+    Both the old and the new dates of the added, changed and deleted periods
+    are taken into account. Returns None if no period was changed.
+
+    :rtype: tuple[datetime.date, datetime.date] | None
+    """
+    dates = []
+    for formset in formsets:
+        if formset.model is not Period:
+            continue
+        for form in formset.forms:
+            if not form.has_changed():
+                continue
+            cleaned_data = getattr(form, 'cleaned_data', {})
+            for key in ('start', 'end'):
+                for value in (form.initial.get(key), cleaned_data.get(key)):
+                    if value:
+                        dates.append(value)
+    if not dates:
+        return None
+    return min(dates), max(dates)
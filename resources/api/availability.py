@@ -0,0 +1,119 @@
+import collections
+import datetime
+
+import pytz
+from django.conf import settings
+from rest_framework import exceptions, viewsets
+from rest_framework.response import Response
+
+from resources.free_time import get_free_hours
+from resources.models import Resource
+from .base import register_view
+from .resource import parse_query_time_range
+
+
+class AvailabilityViewSet(viewsets.ViewSet):
+    """
+    Get the free intervals of several resources at once.
+
+    The resources are selected with the comma-separated `resource` ids, the
+    `unit` id or the comma-separated `resource_group` identifiers. The time
+    range is given with the `start` and `end` query parameters, and the
+    optional `duration` (in minutes) leaves out free intervals that are
+    shorter than that.
+
+    The free intervals are returned per resource and per day in the time zone
+    of the resource's unit. Intervals that continue over midnight are split
+    into the days. Only the free time is returned, so the payload does not
+    depend on the number of reservations.
+
+    The time range can be at most `RESPA_AVAILABILITY_MAX_DAYS` days long and
+    at most `RESPA_AVAILABILITY_MAX_RESOURCES` resources can be requested at
+    once.
+    """
+
+    def list(self, request, *args, **kwargs):
+        params = request.query_params
+
+        times = parse_query_time_range(params)
+        if not times:
+            raise exceptions.ParseError("You must supply both 'start' and 'end'")
+        max_days = getattr(settings, 'RESPA_AVAILABILITY_MAX_DAYS', 31)
+        if times['end'] - times['start'] > datetime.timedelta(days=max_days):
+            raise exceptions.ParseError("The time range can be at most %d days long" % max_days)
+
+        duration = None
+        if 'duration' in params:
+            try:
+                duration = datetime.timedelta(minutes=int(params['duration']))
+            except ValueError:
+                raise exceptions.ParseError("'duration' must be supplied as an integer")
+
+        resources = self.get_resources(request)
+        max_resources = getattr(settings, 'RESPA_AVAILABILITY_MAX_RESOURCES', 100)
+        if len(resources) > max_resources:
+            raise exceptions.ParseError("At most %d resources can be requested at once" % max_resources)
+        free_by_resource = get_free_hours(resources.keys(), times['start'], times['end'], duration=duration)
+
+        ret = []
+        for resource_id, time_zone in resources.items():
+            tz = pytz.timezone(time_zone)
+            days = self._get_days(times['start'], times['end'], tz)
+            for free in free_by_resource[resource_id]:
+                for starts, ends in self._split_by_day(free['starts'], free['ends'], tz):
+                    days.setdefault(starts.date(), []).append(collections.OrderedDict(starts=starts, ends=ends))
+            ret.append(collections.OrderedDict(
+                id=resource_id,
+                days=[collections.OrderedDict(date=date.isoformat(), free=free) for date, free in days.items()]
+            ))
+
+        return Response(ret)
+
+    def get_resources(self, request):
+        """
+        Return an ordered dict of resource id -> unit time zone for the requested resources
+        """
+        params = request.query_params
+        queryset = Resource.objects.visible_for(request.user).filter(unit__isnull=False)
+
+        has_filter = False
+        if params.get('resource'):
+            queryset = queryset.filter(id__in=params['resource'].split(','))
+            has_filter = True
+        if params.get('unit'):
+            queryset = queryset.filter(unit__id=params['unit'])
+            has_filter = True
+        if params.get('resource_group'):
+            queryset = queryset.filter(groups__identifier__in=params['resource_group'].split(',')).distinct()
+            has_filter = True
+        if not has_filter:
+            raise exceptions.ParseError("You must supply 'resource', 'unit' or 'resource_group'")
+
+        queryset = queryset.order_by('unit__name', 'name', 'id')
+        return collections.OrderedDict(queryset.values_list('id', 'unit__time_zone'))
+
+    def _split_by_day(self, starts, ends, tz):
+        """
+        Yield the parts of an interval split at the local midnights
+        """
+        starts = starts.astimezone(tz)
+        ends = ends.astimezone(tz)
+        while starts < ends:
+            next_date = starts.date() + datetime.timedelta(days=1)
+            midnight = tz.localize(datetime.datetime.combine(next_date, datetime.time(0, 0)))
+            part_ends = min(ends, midnight)
+            yield starts, part_ends
+            starts = part_ends
+
+    def _get_days(self, start, end, tz):
+        days = collections.OrderedDict()
+        date = start.astimezone(tz).date()
+        # the range is half-open, so an end at midnight doesn't add a day
+        last_date = (end - datetime.timedelta(microseconds=1)).astimezone(tz).date()
+        while date <= last_date:
+            days[date] = []
+            date += datetime.timedelta(days=1)
+        return days
+
+
+register_view(AvailabilityViewSet, 'availability', base_name='availability')
@@ -1,8 +1,17 @@
+import hashlib
+from calendar import timegm
+
 from django.conf import settings
+from django.db.models import Count, F, Func, Max, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 import django_filters
 from modeltranslation.translator import NotRegistered, translator
-from rest_framework import serializers
+from rest_framework import exceptions, serializers
+
+from resources.cache import get_generation, get_generation_time, is_cache_shared
 
 all_views = []
 
@@ -16,34 +25,165 @@ def register_view(klass, name, base_name=None):
 
 LANGUAGES = [x[0] for x in settings.LANGUAGES]
 
+# Suffix of the annotations holding the values of translated fields in the requested language
+TRANSLATED_VALUE_SUFFIX = '_translated'
+
+
+def get_requested_language(request):
+    """
+    Return the language requested with the `lang` query parameter
+
+    None means that the translated fields are returned in all the languages.
+
+    :rtype: str | None
+    """
+    params = getattr(request, 'query_params', None)
+    lang = params.get('lang') if params else None
+    if not lang:
+        return None
+    if lang not in LANGUAGES:
+        raise exceptions.ParseError("'lang' must be one of: %s" % ', '.join(LANGUAGES))
+    return lang
+
+
+def get_language_fallbacks(lang):
+    """
+    Return the languages in which a translated value is looked for, in order
+
+    :type lang: str
+    :rtype: list[str]
+    """
+    fallbacks = getattr(settings, 'MODELTRANSLATION_FALLBACK_LANGUAGES', ()) + tuple(LANGUAGES)
+    langs = [lang]
+    for fallback in fallbacks:
+        if fallback not in langs:
+            langs.append(fallback)
+    return langs
+
+
+_translation_plans = {}
+
+
+def get_translation_plan(model):
+    """
+    Return the translated fields of the model and the names of their per-language fields
+
+    The plan is computed once per model.
+
+    :rtype: tuple[list[str], set[str]]
+    """
+    plan = _translation_plans.get(model)
+    if plan is None:
+        try:
+            translated_fields = list(translator.get_options_for_model(model).fields.keys())
+        except NotRegistered:
+            translated_fields = []
+        language_field_names = {'%s_%s' % (field_name, lang) for field_name in translated_fields for lang in LANGUAGES}
+        plan = _translation_plans[model] = (translated_fields, language_field_names)
+    return plan
+
+
+def translate_queryset(queryset, lang):
+    """
+    Load the translated fields of the queryset's model in a single language
+
+    Every translated field is annotated with `<field>_translated`, the value
+    in the given language or in the first fallback language that has one,
+    and the per-language columns are deferred, so only one column per field
+    is transferred from the database.
+    """
+    model = queryset.model
+    translated_fields = get_translation_plan(model)[0]
+    if not translated_fields:
+        return queryset
+
+    annotations = {}
+    deferred = []
+    for field_name in translated_fields:
+        columns = ['%s_%s' % (field_name, fallback) for fallback in get_language_fallbacks(lang)]
+        output_field = model._meta.get_field(columns[0])
+        # empty strings fall back to the next language just like nulls
+        values = [Func(F(column), Value(''), function='NULLIF', output_field=output_field) for column in columns]
+        if len(values) > 1:
+            annotations[field_name + TRANSLATED_VALUE_SUFFIX] = Coalesce(*values, output_field=output_field)
+        else:
+            annotations[field_name + TRANSLATED_VALUE_SUFFIX] = values[0]
+        deferred += columns
+    return queryset.annotate(**annotations).defer(*deferred)
+
+
+class SingleLanguageMixin(object):
+    """
+    Load only the requested language of the translated fields with `?lang=`
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        lang = get_requested_language(self.request)
+        if lang:
+            queryset = translate_queryset(queryset, lang)
+        return queryset
+
 
 class TranslatedModelSerializer(serializers.ModelSerializer):
+    """
+    Serialize translated fields as objects keyed by language
+
+    If a language is requested with the `lang` query parameter, translated
+    fields are serialized as plain strings in that language instead, with
+    fallback to the other languages.
+    """
 
     def __init__(self, *args, **kwargs):
         super(TranslatedModelSerializer, self).__init__(*args, **kwargs)
-        model = self.Meta.model
-        try:
-            trans_opts = translator.get_options_for_model(model)
-        except NotRegistered:
-            self.translated_fields = []
-            return
+        self.translated_fields, self._language_field_names = get_translation_plan(self.Meta.model)
 
-        self.translated_fields = trans_opts.fields.keys()
-        # Remove the pre-existing data in the bundle.
-        for field_name in self.translated_fields:
-            for lang in LANGUAGES:
-                key = "%s_%s" % (field_name, lang)
-                if key in self.fields:
-                    del self.fields[key]
+    def get_field_names(self, declared_fields, info):
+        field_names = super().get_field_names(declared_fields, info)
+        # The per-language fields are left out before the fields are built,
+        # so the field map is built only when it is needed and only once.
+        return [field_name for field_name in field_names if field_name not in self._language_field_names]
+
+    def get_translation_language(self):
+        """
+        Return the requested single language or None for all the languages
+        """
+        # the context is shared with the nested serializers
+        if 'translation_language' not in self.context:
+            self.context['translation_language'] = get_requested_language(self.context.get('request'))
+        return self.context['translation_language']
+
+    @property
+    def _readable_fields(self):
+        fields = super()._readable_fields
+        if not self.translated_fields or self.get_translation_language() is None:
+            return fields
+        # Reading the default field through the modeltranslation descriptor
+        # would load the deferred columns, so they are serialized separately.
+        return [field for field in fields if field.field_name not in self.translated_fields]
+
+    def _get_translated_value(self, obj, field_name, lang):
+        annotation = field_name + TRANSLATED_VALUE_SUFFIX
+        if hasattr(obj, annotation):
+            return getattr(obj, annotation) or None
+        for fallback in get_language_fallbacks(lang):
+            val = getattr(obj, "%s_%s" % (field_name, fallback), None)
+            if val not in (None, ""):
+                return val
+        return None
 
     def to_representation(self, obj):
         ret = super(TranslatedModelSerializer, self).to_representation(obj)
         if obj is None:
             return ret
 
+        single_lang = self.get_translation_language()
         for field_name in self.translated_fields:
             if field_name not in self.fields:
                 continue
+            if single_lang:
+                ret[field_name] = self._get_translated_value(obj, field_name, single_lang)
+                continue
             d = {}
             for lang in LANGUAGES:
                 key = "%s_%s" % (field_name, lang)
@@ -85,3 +225,119 @@ class DRFFilterBooleanWidget(django_filters.widgets.BooleanWidget):
     """
     def render(self, *args, **kwargs):
         return None
+
+
+class ConditionalGetMixin(object):
+    """
+    Answer conditional GETs of list and retrieve with 304 Not Modified
+
+    The ETag and Last-Modified validators are computed before serialization
+    from the latest modified_at and the number of the objects in the filtered
+    queryset, the generations of the cache namespaces the response depends on,
+    the current date, the query string and the kind of the requesting user.
+
+    The validators are returned with every successful response. The
+    generations are only seen by all the processes with a shared cache, so
+    without one no validators are computed and no 304s are returned.
+    """
+    # cache namespaces whose changes may change the response
+    validator_namespaces = ()
+
+    def _get_user_key(self, user):
+        if not (user and user.is_authenticated):
+            return 'anonymous'
+        return '%s:%s:%s' % (user.pk, user.is_staff, user.is_superuser)
+
+    def get_validators(self, request, *args, **kwargs):
+        """
+        Return the ETag and the Last-Modified time of the response
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in kwargs:
+            queryset = queryset.filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+        stats = queryset.order_by().aggregate(last_modified=Max('modified_at'), count=Count('pk'))
+
+        # Some fields, like opening_hours_today, change when the day changes.
+        today = timezone.localtime(timezone.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+        modification_times = [today] + [get_generation_time(ns) for ns in self.validator_namespaces]
+        if stats['last_modified']:
+            modification_times.append(stats['last_modified'])
+
+        parts = [
+            type(self).__name__, self.action, stats['count'], stats['last_modified'], today.date(),
+            request.get_full_path(), request.META.get('HTTP_ACCEPT', ''),
+            request.META.get('HTTP_ACCEPT_LANGUAGE', ''), self._get_user_key(request.user),
+        ]
+        parts += [get_generation(ns) for ns in self.validator_namespaces]
+        etag = hashlib.sha1('\0'.join(str(part) for part in parts).encode('utf8')).hexdigest()
+        return etag, max(modification_times)
+
+    def _conditional_response(self, handler, request, *args, **kwargs):
+        if not is_cache_shared():
+            return handler(request, *args, **kwargs)
+
+        etag, last_modified = self.get_validators(request, *args, **kwargs)
+        last_modified = timegm(last_modified.utctimetuple())
+        response = get_conditional_response(request, etag=quote_etag(etag), last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = quote_etag(etag)
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional_response(super().retrieve, request, *args, **kwargs)
+
+
+class SparseFieldsetMixin(object):
+    """
+    Leave out fields of the serialized objects with the `fields` and `omit` query parameters
+
+    `fields` is a comma-separated list of the fields to include and `omit` a
+    list of the fields to leave out. The fields are removed from the root
+    serializer before serialization, so their values are never computed.
+    Nested serializers are not affected.
+    """
+
+    def get_sparse_fieldset(self):
+        """
+        Return the requested fields and the omitted fields
+
+        The requested fields are None if all the fields were requested.
+
+        :rtype: tuple[set[str] | None, set[str]]
+        """
+        if not hasattr(self, '_sparse_fieldset'):
+            params = self.request.query_params if self.request else {}
+            fields = params.get('fields')
+            fields = set(f.strip() for f in fields.split(',') if f.strip()) if fields else None
+            omit = params.get('omit')
+            omit = set(f.strip() for f in omit.split(',') if f.strip()) if omit else set()
+            self._sparse_fieldset = (fields, omit)
+        return self._sparse_fieldset
+
+    def is_field_requested(self, field_name):
+        fields, omit = self.get_sparse_fieldset()
+        if field_name in omit:
+            return False
+        return fields is None or field_name in fields
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if 'data' in kwargs:
+            # write operations need all the fields
+            return serializer
+        fields, omit = self.get_sparse_fieldset()
+        if fields is None and not omit:
+            return serializer
+
+        serializer_fields = getattr(serializer, 'child', serializer).fields
+        for field_name in list(serializer_fields.keys()):
+            if not self.is_field_requested(field_name):
+                del serializer_fields[field_name]
+        return serializer
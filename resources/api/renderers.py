@@ -0,0 +1,99 @@
+"""
+Faster renderers for the API.
+
+FastJSONRenderer renders the same JSON as the JSON renderer of DRF, but
+with orjson when it is installed. orjson is not available for Python 3.5,
+where the stock JSON rendering is used. MessagePackRenderer renders
+application/msgpack with msgpack. NDJSONRenderer is used by the streaming
+exports.
+
+Values that the libraries don't handle natively, like datetimes, Decimals,
+GEOS geometries and lazy translation strings, are encoded the same way as
+DRF's JSON encoder does, so the output doesn't depend on the renderer.
+"""
+import json
+
+import msgpack
+from django.contrib.gis.geos import GEOSGeometry
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_json_encoder = encoders.JSONEncoder()
+
+
+def encode_default(obj):
+    """
+    Encode a value the serialization libraries don't know about
+    """
+    if isinstance(obj, GEOSGeometry):
+        return json.loads(obj.geojson)
+    return _json_encoder.default(obj)
+
+
+def dumps_json(data):
+    """
+    Return data as compact JSON in the same format as the JSON renderers
+
+    :rtype: bytes
+    """
+    if orjson is None:
+        return json.dumps(data, cls=encoders.JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    # Datetimes are passed to encode_default, because DRF formats them
+    # differently from orjson (UTC as "Z", milliseconds only).
+    return orjson.dumps(data, default=encode_default, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    Render JSON with orjson, falling back to the stock renderer
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        # indented output is left to the stock renderer
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return dumps_json(data)
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """
+    Render application/msgpack
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """
+    Render newline delimited JSON, one line per object of a list
+
+    The exports stream their rows themselves, so this is used for the other
+    responses, like errors.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, list):
+            data = [data]
+        return b''.join(dumps_json(row) + b'\n' for row in data)
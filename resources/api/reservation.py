@@ -1,15 +1,15 @@
 import uuid
+from contextlib import contextmanager
 import arrow
 import django_filters
 import logging
 from arrow.parser import ParserError
-from guardian.core import ObjectPermissionChecker
 from django.contrib.auth import get_user_model
 from django.utils.translation import ugettext_lazy as _
 from django.core.exceptions import (
     PermissionDenied, ValidationError as DjangoValidationError
 )
-from django.db.models import Q
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, serializers, filters, exceptions, permissions
@@ -17,16 +17,19 @@ from rest_framework.authentication import TokenAuthentication
 from rest_framework.fields import BooleanField, IntegerField
 from rest_framework import renderers
 from rest_framework.exceptions import NotAcceptable, ValidationError
+from rest_framework.settings import api_settings
 
 from helusers.jwt import JWTAuthentication
 from munigeo import api as munigeo_api
-from resources.models import Reservation, Resource, ReservationMetadataSet
-from resources.models.reservation import RESERVATION_EXTRA_FIELDS
+from resources.models import Reservation, Resource
+from resources.models.permissions import get_permission_matrix
+from resources.models.reservation import RESERVATION_EXTRA_FIELDS, is_reservation_overlap_error
 from resources.pagination import ReservationPagination
+from resources.reference_data import get_reservation_metadata_sets
 from resources.models.utils import generate_reservation_xlsx, get_object_or_none
 
 from .base import (
-    NullableDateTimeField, TranslatedModelSerializer, register_view, DRFFilterBooleanWidget
+    NullableDateTimeField, SparseFieldsetMixin, TranslatedModelSerializer, register_view, DRFFilterBooleanWidget
 )
 
 User = get_user_model()
@@ -40,6 +43,23 @@ except Exception:
     pass
 
 
+@contextmanager
+def reservation_overlap_as_validation_error():
+    """
+    Turn a violation of the reservation overlap constraint into a validation error
+
+    The block is run in a savepoint so that the request transaction can go on
+    after the violation.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        if not is_reservation_overlap_error(exc):
+            raise
+        raise ValidationError(_("The resource is already reserved for some of the period"))
+
+
 class UserSerializer(TranslatedModelSerializer):
     display_name = serializers.ReadOnlyField(source='get_display_name')
     email = serializers.ReadOnlyField()
@@ -181,10 +201,9 @@ class ReservationSerializer(TranslatedModelSerializer, munigeo_api.GeoModelSeria
             if access_code_enabled and reservation and data['access_code'] != reservation.access_code:
                 raise ValidationError(dict(access_code=_('This field cannot be changed')))
 
-        # Mark begin of a critical section. Subsequent calls with this same resource will block here until the first
-        # request is finished. This is needed so that the validations and possible reservation saving are
-        # executed in one block and concurrent requests cannot be validated incorrectly.
-        Resource.objects.select_for_update().get(pk=resource.pk)
+        # Concurrent overlapping reservations that both pass the collision check in model clean are
+        # prevented by the overlap exclusion constraint of the reservation table, see
+        # reservation_overlap_as_validation_error.
 
         # Check maximum number of active reservations per user per resource.
         # Only new reservations are taken into account ie. a normal user can modify an existing reservation
@@ -247,8 +266,8 @@ class ReservationSerializer(TranslatedModelSerializer, munigeo_api.GeoModelSeria
 
         # Show the comments field and the user object only for staff
         if not resource.is_admin(user):
-            del data['comments']
-            del data['user']
+            data.pop('comments', None)
+            data.pop('user', None)
 
         if instance.are_extra_fields_visible(user):
             cache = self.context.get('reservation_metadata_set_cache')
@@ -261,15 +280,15 @@ class ReservationSerializer(TranslatedModelSerializer, munigeo_api.GeoModelSeria
                 data.pop(field_name, None)
 
         if not (resource.is_access_code_enabled() and instance.can_view_access_code(user)):
-            data.pop('access_code')
+            data.pop('access_code', None)
 
         if 'access_code' in data and data['access_code'] == '':
             data['access_code'] = None
 
-        if instance.can_view_catering_orders(user):
+        if self._is_field_requested('has_catering_order') and instance.can_view_catering_orders(user):
             data['has_catering_order'] = instance.catering_orders.exists()
 
-        if instance.purchase:
+        if self._is_field_requested('purchase') and instance.purchase:
             data['purchase'] = {
                 'id': instance.purchase.pk,
                 'paymentUrl': instance.purchase.payment_address
@@ -277,6 +296,13 @@ class ReservationSerializer(TranslatedModelSerializer, munigeo_api.GeoModelSeria
 
         return data
 
+    def _is_field_requested(self, field_name):
+        # the fields added in to_representation are left out with ?fields= and ?omit= like the others
+        view = self.context.get('view')
+        if not hasattr(view, 'is_field_requested'):
+            return True
+        return view.is_field_requested(field_name)
+
     def get_is_own(self, obj):
         return obj.user == self.context['request'].user
 
@@ -479,35 +505,23 @@ class ReservationExcelRenderer(renderers.BaseRenderer):
 
 class ReservationCacheMixin:
     def _preload_permissions(self):
-        units = set()
-        resource_groups = set()
-        resources = set()
-        checker = ObjectPermissionChecker(self.request.user)
-
+        user = self.request.user
+        if not user.is_authenticated:
+            return
+        matrix = get_permission_matrix(user)
         for rv in self._page:
-            resources.add(rv.resource)
-            rv.resource._permission_checker = checker
-
-        for res in resources:
-            units.add(res.unit)
-            for g in res.groups.all():
-                resource_groups.add(g)
-
-        if units:
-            checker.prefetch_perms(units)
-        if resource_groups:
-            checker.prefetch_perms(resource_groups)
+            rv.resource._permission_matrix = matrix
 
     def _get_cache_context(self):
         context = {}
-        set_list = ReservationMetadataSet.objects.all().prefetch_related('supported_fields', 'required_fields')
-        context['reservation_metadata_set_cache'] = {x.id: x for x in set_list}
+        context['reservation_metadata_set_cache'] = get_reservation_metadata_sets()
 
         self._preload_permissions()
         return context
 
 
-class ReservationViewSet(munigeo_api.GeoModelAPIView, viewsets.ModelViewSet, ReservationCacheMixin):
+class ReservationViewSet(SparseFieldsetMixin, munigeo_api.GeoModelAPIView, viewsets.ModelViewSet,
+                         ReservationCacheMixin):
     queryset = Reservation.objects.select_related('user', 'resource', 'resource__unit')\
         .prefetch_related('catering_orders').prefetch_related('resource__groups').order_by('begin', 'resource__unit__name', 'resource__name')
 
@@ -517,7 +531,7 @@ class ReservationViewSet(munigeo_api.GeoModelAPIView, viewsets.ModelViewSet, Res
                        CanApproveFilterBackend)
     filter_class = ReservationFilterSet
     permission_classes = (permissions.IsAuthenticatedOrReadOnly, ReservationPermission)
-    renderer_classes = (renderers.JSONRenderer, renderers.BrowsableAPIRenderer, ReservationExcelRenderer)
+    renderer_classes = tuple(api_settings.DEFAULT_RENDERER_CLASSES) + (ReservationExcelRenderer,)
     pagination_class = ReservationPagination
     authentication_classes = (JWTAuthentication, TokenAuthentication)
     ordering_fields = ('begin',)
@@ -540,29 +554,15 @@ class ReservationViewSet(munigeo_api.GeoModelAPIView, viewsets.ModelViewSet, Res
         return context
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        user = self.request.user
-
-        # staff members can see all reservations
-        if user.is_staff:
-            return queryset
-
-        # normal users can see only their own reservations and reservations that are confirmed or requested
-        filters = Q(state__in=(Reservation.CONFIRMED, Reservation.REQUESTED))
-        if user.is_authenticated:
-            filters |= Q(user=user)
-        queryset = queryset.filter(filters)
-
-        queryset = queryset.filter(resource__in=Resource.objects.visible_for(user))
-
-        return queryset
+        return super().get_queryset().visible_for(self.request.user)
 
     def perform_create(self, serializer):
         override_data = {'created_by': self.request.user, 'modified_by': self.request.user}
         if 'user' not in serializer.validated_data:
             override_data['user'] = self.request.user
         override_data['state'] = Reservation.CREATED
-        instance = serializer.save(**override_data)
+        with reservation_overlap_as_validation_error():
+            instance = serializer.save(**override_data)
 
         resource = serializer.validated_data['resource']
         manual_price = self.request.data.get('manual_price')
@@ -590,8 +590,9 @@ class ReservationViewSet(munigeo_api.GeoModelAPIView, viewsets.ModelViewSet, Res
     def perform_update(self, serializer):
         old_instance = self.get_object()
         new_state = serializer.validated_data.pop('state', old_instance.state)
-        new_instance = serializer.save(modified_by=self.request.user)
-        new_instance.set_state(new_state, self.request.user)
+        with reservation_overlap_as_validation_error():
+            new_instance = serializer.save(modified_by=self.request.user)
+            new_instance.set_state(new_state, self.request.user)
 
     def perform_destroy(self, instance):
         instance.set_state(Reservation.CANCELLED, self.request.user)
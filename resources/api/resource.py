@@ -5,24 +5,36 @@ import arrow
 import django_filters
 import pytz
 from arrow.parser import ParserError
+from psycopg2.extras import DateTimeTZRange
 
 from django import forms
-from django.db.models import Q
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.expressions import RawSQL
 from django.urls import reverse
+from django.utils import translation
 from django.contrib.gis.db.models.functions import Distance
 from django.contrib.gis.geos import Point
-from resources.pagination import PurposePagination
+from resources.pagination import PurposePagination, ResourcePagination
 from rest_framework import exceptions, filters, mixins, serializers, viewsets, response, status
 from rest_framework.decorators import detail_route
-from guardian.core import ObjectPermissionChecker
 
 from munigeo import api as munigeo_api
 from resources.models import (
     Purpose, Reservation, Resource, ResourceImage, ResourceType, ResourceEquipment,
-    TermsOfUse, Equipment, ReservationMetadataSet, ResourceDailyOpeningHours
+    TermsOfUse, ResourceDailyOpeningHours
 )
+from resources.cache import RESOURCE_REPRESENTATION, RESOURCE_STATE, is_cache_shared, make_key
+from resources.free_time import get_free_slot_resource_ids_sql
+from resources.search import search_resources
+from resources.reference_data import get_equipment, get_reservation_metadata_sets, get_resource_types, get_terms_of_use
+from resources.models.permissions import get_permission_matrix
 from resources.models.resource import determine_hours_time_range
-from .base import TranslatedModelSerializer, register_view, DRFFilterBooleanWidget
+from .base import (
+    ConditionalGetMixin, SingleLanguageMixin, SparseFieldsetMixin, TranslatedModelSerializer, register_view,
+    DRFFilterBooleanWidget
+)
 from .reservation import ReservationSerializer
 from .unit import UnitSerializer
 from .equipment import EquipmentSerializer
@@ -47,6 +59,24 @@ def parse_query_time_range(params):
     return times
 
 
+def get_favorite_resource_ids(request):
+    """
+    Return the ids of the favorite resources of the request user
+
+    The ids are loaded with one query and kept for the rest of the request.
+
+    :type request: rest_framework.request.Request
+    :rtype: set[str]
+    """
+    if not hasattr(request, '_favorite_resource_ids'):
+        user = request.user
+        if user.is_authenticated:
+            request._favorite_resource_ids = set(user.favorite_resources.values_list('id', flat=True))
+        else:
+            request._favorite_resource_ids = set()
+    return request._favorite_resource_ids
+
+
 def get_resource_reservations_queryset(begin, end):
     qs = Reservation.objects.filter(begin__lte=end, end__gte=begin).current()
     qs = qs.order_by('begin').prefetch_related('catering_orders').select_related('user')
@@ -122,7 +152,7 @@ class ResourceEquipmentSerializer(TranslatedModelSerializer):
 
     def to_representation(self, obj):
         # remove unnecessary nesting and aliases
-        if 'equipment_cache' in self.context:
+        if obj.equipment_id in self.context.get('equipment_cache', {}):
             obj.equipment = self.context['equipment_cache'][obj.equipment_id]
         ret = super().to_representation(obj)
         ret['name'] = ret['equipment']['name']
@@ -156,6 +186,10 @@ class ResourceSerializer(TranslatedModelSerializer, munigeo_api.GeoModelSerializ
     reservable_days_in_advance = serializers.ReadOnlyField(source='get_reservable_days_in_advance')
     reservable_before = serializers.SerializerMethodField()
 
+    # Fields that depend on the request user or the query parameters. They are
+    # left out of the representation cache and serialized on every request.
+    per_request_fields = ('opening_hours', 'reservations', 'user_permissions', 'is_favorite', 'reservable_before')
+
     def get_user_permissions(self, obj):
         request = self.context.get('request', None)
         return {
@@ -165,12 +199,19 @@ class ResourceSerializer(TranslatedModelSerializer, munigeo_api.GeoModelSerializ
         }
 
     def get_is_favorite(self, obj):
-        request = self.context.get('request', None)
-        return request.user in obj.favorited_by.all()
+        favorite_ids = self.context.get('favorite_resource_ids')
+        if favorite_ids is None:
+            request = self.context.get('request', None)
+            favorite_ids = get_favorite_resource_ids(request) if request else set()
+        return obj.id in favorite_ids
 
     def get_generic_terms(self, obj):
-        data = TermsOfUseSerializer(obj.generic_terms).data
-        return data['text']
+        # the same terms are shared by most of the resources
+        terms_cache = self.context.setdefault('generic_terms_data', {})
+        if obj.generic_terms_id not in terms_cache:
+            data = TermsOfUseSerializer(obj.generic_terms, context=self.context).data
+            terms_cache[obj.generic_terms_id] = data['text']
+        return terms_cache[obj.generic_terms_id]
 
     def get_reservable_before(self, obj):
         request = self.context.get('request')
@@ -189,19 +230,56 @@ class ResourceSerializer(TranslatedModelSerializer, munigeo_api.GeoModelSerializ
             return obj
 
         # We cache the metadata objects to save on SQL roundtrips
-        if 'reservation_metadata_set_cache' in self.context:
-            set_id = obj.reservation_metadata_set_id
-            if set_id:
-                obj.reservation_metadata_set = self.context['reservation_metadata_set_cache'][set_id]
-        ret = super().to_representation(obj)
-        if hasattr(obj, 'distance'):
-            if obj.distance is not None:
-                ret['distance'] = int(obj.distance.m)
-            elif obj.unit_distance is not None:
-                ret['distance'] = int(obj.unit_distance.m)
+        for field_name, cache_name in (('reservation_metadata_set', 'reservation_metadata_set_cache'),
+                                       ('type', 'resource_type_cache'), ('generic_terms', 'terms_of_use_cache')):
+            related_id = getattr(obj, field_name + '_id')
+            if related_id and related_id in self.context.get(cache_name, {}):
+                setattr(obj, field_name, self.context[cache_name][related_id])
+
+        cache_key = self._get_representation_cache_key(obj)
+        cached = cache.get(cache_key) if cache_key else None
+        if cached is None:
+            ret = super().to_representation(obj)
+            if cache_key:
+                cached = {key: val for key, val in ret.items() if key not in self.per_request_fields}
+                cache.set(cache_key, cached, settings.RESPA_RESOURCE_CACHE_TIMEOUT)
+        else:
+            ret = self._add_per_request_fields(obj, cached)
+
+        if getattr(obj, 'distance', None) is not None:
+            ret['distance'] = int(obj.distance.m)
 
         return ret
 
+    def _get_representation_cache_key(self, obj):
+        request = self.context.get('request')
+        if not getattr(settings, 'RESPA_RESOURCE_CACHE_TIMEOUT', None) or request is None or not obj.modified_at:
+            return None
+        if not is_cache_shared():
+            return None
+        if not hasattr(self, '_representation_key_parts'):
+            # Image URLs are absolute, so the host is a part of the key.
+            self._representation_key_parts = (
+                translation.get_language(), self.get_translation_language(), request.build_absolute_uri('/'),
+                ','.join(self.fields.keys())
+            )
+        return make_key(
+            RESOURCE_REPRESENTATION, type(self).__name__, obj.pk, obj.modified_at.isoformat(),
+            *self._representation_key_parts
+        )
+
+    def _add_per_request_fields(self, obj, cached):
+        ret = collections.OrderedDict()
+        for field in self._readable_fields:
+            if field.field_name in self.per_request_fields:
+                ret[field.field_name] = field.to_representation(field.get_attribute(obj))
+            else:
+                ret[field.field_name] = cached[field.field_name]
+        # in the single language mode the translated fields are not readable fields
+        for key, val in cached.items():
+            ret.setdefault(key, val)
+        return ret
+
     def get_location(self, obj):
         if obj.location is not None:
             return obj.location
@@ -211,7 +289,12 @@ class ResourceSerializer(TranslatedModelSerializer, munigeo_api.GeoModelSerializ
         """
         Parses request time parameters for serializing available_hours, opening_hours
         and reservations
+
+        The parameters are parsed only once per request.
         """
+        if self.context.get('parameters_parsed'):
+            return
+        self.context['parameters_parsed'] = True
 
         params = self.context['request'].query_params
         times = parse_query_time_range(params)
@@ -261,17 +344,23 @@ class ResourceSerializer(TranslatedModelSerializer, munigeo_api.GeoModelSerializ
             rv_list = get_resource_reservations_queryset(self.context['start'], self.context['end'])
             rv_list = rv_list.filter(resource=obj)
 
-        rv_ser_list = ReservationSerializer(rv_list, many=True, context=self.context).data
-        return rv_ser_list
+        # one list serializer is shared by all the resources
+        if not hasattr(self, '_reservation_serializer'):
+            self._reservation_serializer = ReservationSerializer(many=True, context=self.context)
+        return self._reservation_serializer.to_representation(rv_list)
 
     class Meta:
         model = Resource
-        exclude = ('reservation_confirmed_notification_extra', 'access_code_type', 'reservation_metadata_set')
+        exclude = ('reservation_confirmed_notification_extra', 'access_code_type', 'reservation_metadata_set',
+                   'search_vector_fi', 'search_vector_sv', 'search_vector_en', 'effective_location')
 
 
 class ResourceDetailsSerializer(ResourceSerializer):
     unit = UnitSerializer()
 
+    # reservable_before of the unit depends on the user and opening_hours_today on the date
+    per_request_fields = ResourceSerializer.per_request_fields + ('unit',)
+
 
 class ParentFilter(django_filters.Filter):
     """
@@ -290,10 +379,6 @@ class ParentCharFilter(ParentFilter):
 
 
 class ResourceFilterSet(django_filters.FilterSet):
-    def __init__(self, *args, **kwargs):
-        self.user = kwargs.pop('user')
-        super().__init__(*args, **kwargs)
-
     purpose = ParentCharFilter(name='purposes__id', lookup_expr='iexact')
     type = django_filters.Filter(name='type__id', lookup_expr='in', widget=django_filters.widgets.CSVWidget)
     people = django_filters.NumberFilter(name='people_capacity', lookup_expr='gte')
@@ -307,18 +392,14 @@ class ResourceFilterSet(django_filters.FilterSet):
                                       widget=django_filters.widgets.CSVWidget, distinct=True)
     available_between = django_filters.Filter(method='filter_available_between',
                                               widget=django_filters.widgets.CSVWidget)
+    free_slot = django_filters.Filter(method='filter_free_slot', widget=django_filters.widgets.CSVWidget)
 
     def filter_is_favorite(self, queryset, name, value):
-        if not self.user.is_authenticated():
-            if value:
-                return queryset.none()
-            else:
-                return queryset
-
+        favorite_ids = get_favorite_resource_ids(self.request)
         if value:
-            return queryset.filter(favorited_by=self.user)
+            return queryset.filter(id__in=favorite_ids)
         else:
-            return queryset.exclude(favorited_by=self.user)
+            return queryset.exclude(id__in=favorite_ids)
 
     def _deserialize_datetime(self, value):
         try:
@@ -326,23 +407,6 @@ class ResourceFilterSet(django_filters.FilterSet):
         except ParserError:
             raise exceptions.ParseError("'%s' must be a timestamp in ISO 8601 format" % value)
 
-    def _is_resource_open(self, resource, start, end):
-        opening_hours = resource.get_opening_hours(start, end)
-        if len(opening_hours) > 1:
-            # range spans over multiple days, assume resources aren't open all night and skip the resource
-            return False
-
-        hours = next(iter(opening_hours.values()))[0]  # assume there is only one hours obj per day
-        if not hours['opens'] and not hours['closes']:
-            return False
-
-        start_too_early = hours['opens'] and start < hours['opens']
-        end_too_late = hours['closes'] and end > hours['closes']
-        if start_too_early or end_too_late:
-            return False
-
-        return True
-
     def filter_available_between(self, queryset, name, value):
         if len(value) != 2:
             raise exceptions.ParseError('available_between takes exactly two comma-separated values.')
@@ -353,37 +417,80 @@ class ResourceFilterSet(django_filters.FilterSet):
         if available_start.date() != available_end.date():
             raise exceptions.ParseError('available_between timestamps must be on the same day.')
 
-        # exclude resources that have reservation(s) overlapping with the available_between range
+        # Both checks are done in the database. The requested range must be
+        # contained in the resource's opening hours of some day (range
+        # operator @>), and it must not overlap any current reservation.
+        bounds = '[)' if available_start < available_end else '[]'
+        requested_range = DateTimeTZRange(available_start, available_end, bounds)
+        opening_hours = ResourceDailyOpeningHours.objects.filter(
+            resource=OuterRef('pk'), open_between__contains=requested_range
+        )
         overlapping_reservations = Reservation.objects.filter(
-            resource__in=queryset, end__gt=available_start, begin__lt=available_end
+            resource=OuterRef('pk'), end__gt=available_start, begin__lt=available_end
         ).current()
-        queryset = queryset.exclude(reservations__in=overlapping_reservations)
-        closed_resource_ids = {
-            resource.id
-            for resource in queryset
-            if not self._is_resource_open(resource, available_start, available_end)
-        }
 
-        return queryset.exclude(id__in=closed_resource_ids)
+        queryset = queryset.annotate(
+            is_open_between=Exists(opening_hours),
+            is_reserved_between=Exists(overlapping_reservations),
+        )
+        return queryset.filter(is_open_between=True, is_reserved_between=False)
+
+    def filter_free_slot(self, queryset, name, value):
+        if len(value) != 3:
+            raise exceptions.ParseError('free_slot takes exactly three comma-separated values: '
+                                        'duration in minutes, start and end.')
+
+        try:
+            duration = datetime.timedelta(minutes=int(value[0]))
+        except ValueError:
+            raise exceptions.ParseError('free_slot duration must be supplied as an integer.')
+        if duration <= datetime.timedelta(0):
+            raise exceptions.ParseError('free_slot duration must be positive.')
+
+        start = self._deserialize_datetime(value[1])
+        end = self._deserialize_datetime(value[2])
+        if end <= start:
+            raise exceptions.ParseError('free_slot end must be after start.')
+
+        sql, params = get_free_slot_resource_ids_sql(start, end, duration, resources=queryset)
+        return queryset.filter(id__in=RawSQL(sql, params))
 
     class Meta:
         model = Resource
-        fields = ['purpose', 'type', 'people', 'need_manual_confirmation', 'is_favorite', 'unit', 'available_between']
+        fields = ['purpose', 'type', 'people', 'need_manual_confirmation', 'is_favorite', 'unit', 'available_between',
+                  'free_slot']
 
 
 class ResourceFilterBackend(filters.BaseFilterBackend):
     """
-    Make request user available in the filter set.
+    Make the request available in the filter set.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        return ResourceFilterSet(request.query_params, queryset=queryset, request=request).qs
+
+
+class ResourceSearchFilterBackend(filters.BaseFilterBackend):
+    """
+    Full-text search of resources with the `search` query parameter, best matches first.
     """
 
     def filter_queryset(self, request, queryset, view):
-        return ResourceFilterSet(request.query_params, queryset=queryset, user=request.user).qs
+        text = request.query_params.get('search', '').strip()
+        if not text:
+            return queryset
+        return search_resources(queryset, text)
 
 
 class LocationFilterBackend(filters.BaseFilterBackend):
     """
     Filters based on resource (or resource unit) location.
+
+    The resources are ordered nearest first with the KNN operator on the
+    geography index of the effective location, and the optional `distance`
+    (in meters) is checked with ST_DWithin, so both can use the index.
     """
+    point_sql = 'ST_SetSRID(ST_MakePoint(%s, %s), {srid})::geography'.format(srid=settings.DEFAULT_SRID)
 
     def filter_queryset(self, request, queryset, view):
         query_params = request.query_params
@@ -396,9 +503,11 @@ class LocationFilterBackend(filters.BaseFilterBackend):
         except ValueError:
             raise exceptions.ParseError("'lat' and 'lon' need to be floating point numbers")
         point = Point(lon, lat, srid=4326)
-        queryset = queryset.annotate(distance=Distance('location', point))
-        queryset = queryset.annotate(unit_distance=Distance('unit__location', point))
-        queryset = queryset.order_by('distance', 'unit_distance')
+        table = Resource._meta.db_table
+        queryset = queryset.annotate(distance=Distance('effective_location', point))
+        queryset = queryset.order_by(
+            RawSQL('%s.effective_location::geography <-> %s' % (table, self.point_sql), (lon, lat)).asc()
+        )
 
         if 'distance' in query_params:
             try:
@@ -407,32 +516,48 @@ class LocationFilterBackend(filters.BaseFilterBackend):
                     raise ValueError()
             except ValueError:
                 raise exceptions.ParseError("'distance' needs to be a floating point number")
-            q = Q(location__distance_lte=(point, distance)) | Q(unit__location__distance_lte=(point, distance))
-            queryset = queryset.filter(q)
+            within_sql = 'SELECT id FROM %s WHERE ST_DWithin(effective_location::geography, %s, %%s)' % (
+                table, self.point_sql
+            )
+            queryset = queryset.filter(id__in=RawSQL(within_sql, (lon, lat, distance)))
         return queryset
 
+
 class ResourceCacheMixin:
+    # Prefetches that are needed only for serializing the given fields
+    field_prefetches = {
+        'equipment': ('resource_equipment', 'resource_equipment__equipment'),
+        'purposes': ('purposes',),
+        'images': ('images',),
+    }
+
+    def _prefetch_requested_fields(self, queryset):
+        lookups = ['groups']
+        for field_name, field_lookups in self.field_prefetches.items():
+            if self.is_field_requested(field_name):
+                lookups += field_lookups
+        return queryset.prefetch_related(None).prefetch_related(*lookups)
+
     def _preload_opening_hours(self, times):
-        # We have to evaluate the query here to make sure all the
-        # resources are on the same timezone. In case of different
-        # time zones, we skip this optimization.
-        time_zone = None
-        hours_by_resource = {}
+        # The hours are requested by local dates, so the range depends on the
+        # time zone of the resource's unit. The resources are grouped by time
+        # zone and the hours of all the groups are fetched in one query.
+        resource_ids_by_tz = {}
         for resource in self._page:
-            if time_zone:
-                if resource.unit.time_zone != time_zone:
-                    return None
-            else:
-                time_zone = resource.unit.time_zone
-            hours_by_resource[resource.id] = []
-        if not time_zone:
+            if resource.unit is not None:
+                resource_ids_by_tz.setdefault(resource.unit.time_zone, []).append(resource.id)
+        if not resource_ids_by_tz:
             return None
 
-        begin, end = determine_hours_time_range(times.get('start'), times.get('end'), pytz.timezone(time_zone))
-        hours = ResourceDailyOpeningHours.objects.filter(
-            resource__in=self._page, open_between__overlap=(begin, end, '[)')
-        )
-        for obj in hours:
+        query = Q()
+        hours_by_resource = {}
+        for time_zone, resource_ids in resource_ids_by_tz.items():
+            begin, end = determine_hours_time_range(times.get('start'), times.get('end'), pytz.timezone(time_zone))
+            query |= Q(resource__in=resource_ids, open_between__overlap=(begin, end, '[)'))
+            for resource_id in resource_ids:
+                hours_by_resource[resource_id] = []
+
+        for obj in ResourceDailyOpeningHours.objects.filter(query):
             hours_by_resource[obj.resource_id].append(obj)
         return hours_by_resource
 
@@ -446,52 +571,49 @@ class ResourceCacheMixin:
         return reservations_by_resource
 
     def _preload_permissions(self):
-        units = set()
-        resource_groups = set()
-        checker = ObjectPermissionChecker(self.request.user)
+        user = self.request.user
+        if not user.is_authenticated:
+            return
+        matrix = get_permission_matrix(user)
         for res in self._page:
-            units.add(res.unit)
-            for g in res.groups.all():
-                resource_groups.add(g)
-            res._permission_checker = checker
-
-        if units:
-            checker.prefetch_perms(units)
-        if resource_groups:
-            checker.prefetch_perms(resource_groups)
+            res._permission_matrix = matrix
 
     def _get_cache_context(self):
         context = {}
 
-        equipment_list = Equipment.objects.filter(resource_equipment__resource__in=self._page).distinct().\
-            select_related('category').prefetch_related('aliases')
-        equipment_cache = {x.id: x for x in equipment_list}
-
-        context['equipment_cache'] = equipment_cache
-        set_list = ReservationMetadataSet.objects.all().prefetch_related('supported_fields', 'required_fields')
-        context['reservation_metadata_set_cache'] = {x.id: x for x in set_list}
+        if self.is_field_requested('equipment'):
+            context['equipment_cache'] = get_equipment()
+        context['reservation_metadata_set_cache'] = get_reservation_metadata_sets()
+        context['resource_type_cache'] = get_resource_types()
+        context['terms_of_use_cache'] = get_terms_of_use()
 
         times = parse_query_time_range(self.request.query_params)
-        if times:
+        if times and self.is_field_requested('reservations'):
             context['reservations_cache'] = self._preload_reservations(times)
-        context['opening_hours_cache'] = self._preload_opening_hours(times)
+        if self.is_field_requested('opening_hours'):
+            context['opening_hours_cache'] = self._preload_opening_hours(times)
+
+        if self.is_field_requested('is_favorite'):
+            context['favorite_resource_ids'] = get_favorite_resource_ids(self.request)
 
-        self._preload_permissions()
+        if any(self.is_field_requested(f) for f in ('user_permissions', 'reservable_before', 'reservations')):
+            self._preload_permissions()
 
         return context
 
 
-class ResourceListViewSet(munigeo_api.GeoModelAPIView, mixins.ListModelMixin,
-                          viewsets.GenericViewSet, ResourceCacheMixin):
-    queryset = Resource.objects.select_related('generic_terms', 'unit', 'type', 'reservation_metadata_set')
-    queryset = queryset.prefetch_related('favorited_by', 'resource_equipment', 'resource_equipment__equipment',
+class ResourceListViewSet(ConditionalGetMixin, SparseFieldsetMixin, SingleLanguageMixin,
+                          munigeo_api.GeoModelAPIView, mixins.ListModelMixin, viewsets.GenericViewSet,
+                          ResourceCacheMixin):
+    queryset = Resource.objects.select_related('unit').defer(
+        'search_vector_fi', 'search_vector_sv', 'search_vector_en', 'effective_location'
+    )
+    queryset = queryset.prefetch_related('resource_equipment', 'resource_equipment__equipment',
                                          'purposes', 'images', 'purposes', 'groups')
     serializer_class = ResourceSerializer
-    filter_backends = (filters.SearchFilter, ResourceFilterBackend, LocationFilterBackend)
-    search_fields = ('name_fi', 'description_fi', 'unit__name_fi', 'unit__description_fi',
-                     'name_sv', 'description_sv', 'unit__name_sv', 'unit__description_sv',
-		     'equipment__name', 'resource_equipment__description', 
-                     'name_en', 'description_en', 'unit__name_en', 'unit__description_en')
+    filter_backends = (ResourceSearchFilterBackend, ResourceFilterBackend, LocationFilterBackend)
+    validator_namespaces = (RESOURCE_REPRESENTATION, RESOURCE_STATE)
+    pagination_class = ResourcePagination
 
     def get_serializer(self, page, *args, **kwargs):
         self._page = page
@@ -503,16 +625,19 @@ class ResourceListViewSet(munigeo_api.GeoModelAPIView, mixins.ListModelMixin,
         return context
 
     def get_queryset(self):
+        queryset = self._prefetch_requested_fields(self.queryset)
         if self.request.user.is_staff:
-            return self.queryset
+            return queryset
         else:
-            return self.queryset.filter(public=True)
+            return queryset.filter(public=True)
 
 
-class ResourceViewSet(munigeo_api.GeoModelAPIView, mixins.RetrieveModelMixin,
-                      viewsets.GenericViewSet, ResourceCacheMixin):
+class ResourceViewSet(ConditionalGetMixin, SparseFieldsetMixin, SingleLanguageMixin,
+                      munigeo_api.GeoModelAPIView, mixins.RetrieveModelMixin, viewsets.GenericViewSet,
+                      ResourceCacheMixin):
     serializer_class = ResourceDetailsSerializer
     queryset = ResourceListViewSet.queryset
+    validator_namespaces = (RESOURCE_REPRESENTATION, RESOURCE_STATE)
 
     def get_serializer(self, page, *args, **kwargs):
         self._page = [page]
@@ -524,10 +649,11 @@ class ResourceViewSet(munigeo_api.GeoModelAPIView, mixins.RetrieveModelMixin,
         return context
 
     def get_queryset(self):
+        queryset = self._prefetch_requested_fields(self.queryset)
         if self.request.user.is_staff:
-            return self.queryset
+            return queryset
         else:
-            return self.queryset.filter(public=True)
+            return queryset.filter(public=True)
 
     def _set_favorite(self, request, value):
         resource = self.get_object()
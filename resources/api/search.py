@@ -1,11 +1,49 @@
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.core.cache import cache
 from django.db.models import Q
-from django.utils.encoding import force_text
+from django.db.models.functions import Greatest
+from django.utils import translation
 from rest_framework import viewsets
 from rest_framework.fields import BooleanField
 from rest_framework.response import Response
 
 from resources.api.resource import ResourceListViewSet
 from resources.api.unit import UnitViewSet
+from resources.cache import RESOURCE_REPRESENTATION, make_key
+from resources.models.utils import DEFAULT_LANG
+
+LANGUAGES = [x[0] for x in settings.LANGUAGES]
+
+
+def _get_name_languages():
+    # the same order as in get_translated(): the default language and then
+    # the active language with the fallbacks of modeltranslation
+    fallbacks = getattr(settings, 'MODELTRANSLATION_FALLBACK_LANGUAGES', ())
+    langs = []
+    for lang in [DEFAULT_LANG, translation.get_language()] + list(fallbacks) + LANGUAGES:
+        if lang in LANGUAGES and lang not in langs:
+            langs.append(lang)
+    return langs
+
+
+def _get_name(values, prefix=''):
+    for lang in _get_name_languages():
+        name = values[prefix + 'name_' + lang]
+        if name:
+            return name
+    return None
+
+
+def get_resource_text(values):
+    # the same as str() of the resource
+    unit_text = get_unit_text(values, 'unit__') if values['unit__id'] else None
+    return '%s (%s)/%s' % (_get_name(values), values['id'], unit_text)
+
+
+def get_unit_text(values, prefix=''):
+    # the same as str() of the unit
+    return '%s (%s)' % (_get_name(values, prefix), values[prefix + 'id'])
 
 
 class TypeaheadViewSet(viewsets.ViewSet):
@@ -14,7 +52,7 @@ class TypeaheadViewSet(viewsets.ViewSet):
     input (the `input` query parameter).
 
     The format of the return data is a mapping of object type to a list
-    of object representations.
+    of object representations, best matches first.
 
     By default, just the object's `id` and a related `text`
     are returned. This can be changed with the `full` query parameter.
@@ -27,8 +65,15 @@ class TypeaheadViewSet(viewsets.ViewSet):
     Currently supported are "resource" and "unit".
     """
     objects = {
-        "resource": {"search_fields": ["name"], "viewset": ResourceListViewSet, "text_getter": force_text},
-        "unit": {"search_fields": ["name"], "viewset": UnitViewSet, "text_getter": force_text},
+        "resource": {
+            "search_fields": ["name"], "viewset": ResourceListViewSet, "text_getter": get_resource_text,
+            "values": ["id", "unit__id"] + ["name_%s" % lang for lang in LANGUAGES] +
+                      ["unit__name_%s" % lang for lang in LANGUAGES],
+        },
+        "unit": {
+            "search_fields": ["name"], "viewset": UnitViewSet, "text_getter": get_unit_text,
+            "values": ["id"] + ["name_%s" % lang for lang in LANGUAGES],
+        },
     }
 
     def list(self, request, *args, **kwargs):
@@ -47,12 +92,36 @@ class TypeaheadViewSet(viewsets.ViewSet):
         requested_objects = set(request.query_params.get("types", ",".join(self.objects.keys())).split(","))
 
         for obj_name in requested_objects:
-            obj_list = self.get_single_object_type_object_list(request, obj_name, query_parts, full=full)
+            if full:
+                obj_list = self.get_single_object_type_object_list(request, obj_name, query_parts, full=True)
+            else:
+                obj_list = self.get_cached_object_list(request, obj_name, query_parts)
             if obj_list:
                 yield obj_list
 
+    def get_cached_object_list(self, request, obj_name, query_parts):
+        """
+        Return the non-full object list from the cache if it's there
+
+        The list depends only on the query, the active language and on what
+        the user is allowed to see, so it can be shared by all the users of
+        the same kind.
+        """
+        timeout = getattr(settings, 'RESPA_TYPEAHEAD_CACHE_TIMEOUT', None)
+        if not timeout or obj_name not in self.objects:
+            return self.get_single_object_type_object_list(request, obj_name, query_parts)
+
+        visibility = 'staff' if request.user.is_staff else 'public'
+        key = make_key(RESOURCE_REPRESENTATION, 'typeahead', obj_name, visibility, translation.get_language(),
+                       *query_parts)
+        obj_list = cache.get(key)
+        if obj_list is None:
+            obj_list = self.get_single_object_type_object_list(request, obj_name, query_parts)
+            # an empty result is cached too
+            cache.set(key, obj_list or (), timeout)
+        return obj_list
+
     def get_single_object_type_object_list(self, request, obj_name, query_parts, full=False):
-        # TODO: Could add caching here, keyed on `query_parts`
         obj_schema = self.objects.get(obj_name)
         if not obj_schema:
             return None
@@ -62,22 +131,38 @@ class TypeaheadViewSet(viewsets.ViewSet):
         # in the general API.
         viewset_class = obj_schema["viewset"]
         object_viewset = viewset_class(request=request)
-        object_viewset.initial(request)
-        queryset = object_viewset.get_queryset().filter(q)[:10]  # TODO: Sort these?
-        if queryset.exists():
-            if full:
-                data = object_viewset.get_serializer(queryset, many=True).data
-            else:
-                text_getter = obj_schema["text_getter"]
-                data = [{"id": obj.pk, "text": text_getter(obj)} for obj in queryset]
+        if full:
+            object_viewset.initial(request)
+        queryset = object_viewset.get_queryset().filter(q)
+        queryset = queryset.annotate(similarity=self.build_similarity(obj_schema["search_fields"], query_parts))
+        queryset = queryset.order_by('-similarity', 'id')
+
+        if full:
+            data = object_viewset.get_serializer(queryset[:10], many=True).data
+        else:
+            # only the texts are needed, so model instances are not created
+            text_getter = obj_schema["text_getter"]
+            values = queryset.prefetch_related(None).values(*obj_schema["values"])[:10]
+            data = [{"id": obj["id"], "text": text_getter(obj)} for obj in values]
+        if data:
             return (obj_name, data)
 
     def build_q(self, fields, query_parts):
         q = Q()
         for field in fields:
-            field_q = Q()
-            for i, part in enumerate(query_parts):
-                key = ("%s__istartswith" % field if i == 0 else "%s__icontains" % field)
-                field_q &= Q(**{key: part})
-            q |= field_q
+            for lang in LANGUAGES:
+                field_q = Q()
+                for i, part in enumerate(query_parts):
+                    key = ("%s_%s__istartswith" % (field, lang) if i == 0 else "%s_%s__icontains" % (field, lang))
+                    field_q &= Q(**{key: part})
+                q |= field_q
         return q
+
+    def build_similarity(self, fields, query_parts):
+        text = ' '.join(query_parts)
+        similarities = [
+            TrigramSimilarity('%s_%s' % (field, lang), text) for field in fields for lang in LANGUAGES
+        ]
+        if len(similarities) == 1:
+            return similarities[0]
+        return Greatest(*similarities)
@@ -2,7 +2,11 @@ from rest_framework import serializers, viewsets
 
 import django_filters
 from munigeo import api as munigeo_api
-from resources.api.base import NullableDateTimeField, TranslatedModelSerializer, register_view
+from resources.api.base import (
+    ConditionalGetMixin, NullableDateTimeField, SingleLanguageMixin, SparseFieldsetMixin, TranslatedModelSerializer,
+    register_view
+)
+from resources.cache import RESOURCE_REPRESENTATION, RESOURCE_STATE
 from resources.models import Unit
 
 
@@ -40,11 +44,13 @@ class UnitSerializer(TranslatedModelSerializer, munigeo_api.GeoModelSerializer):
         fields = '__all__'
 
 
-class UnitViewSet(munigeo_api.GeoModelAPIView, viewsets.ReadOnlyModelViewSet):
+class UnitViewSet(ConditionalGetMixin, SparseFieldsetMixin, SingleLanguageMixin, munigeo_api.GeoModelAPIView,
+                  viewsets.ReadOnlyModelViewSet):
     queryset = Unit.objects.all()
     serializer_class = UnitSerializer
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
     filter_class = UnitFilterSet
+    validator_namespaces = (RESOURCE_REPRESENTATION, RESOURCE_STATE)
 
 
 register_view(UnitViewSet, 'unit')
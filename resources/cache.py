@@ -0,0 +1,107 @@
+"""
+Helpers for keeping data derived from the database in the Django cache.
+
+Cached data is grouped into namespaces that each have a generation number.
+The generation is a part of every cache key of the namespace, so bumping it
+invalidates all the entries of the namespace at once without having to know
+their keys. Generations start from a millisecond timestamp and are incremented
+atomically, and the time of the latest change is stored next to them.
+
+Generations only invalidate the entries of other processes if they share
+the cache, so the caches that depend on them are used only when
+is_cache_shared() is true.
+"""
+import datetime
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+
+GENERATION_KEY = 'respa:generation:%s'
+GENERATION_TIME_KEY = 'respa:generation-time:%s'
+
+# Serialized resources without the parts that depend on the request
+RESOURCE_REPRESENTATION = 'resource-representation'
+# Reservations, opening hours, favorites and permissions, which change the
+# per-request parts of resources and units
+RESOURCE_STATE = 'resource-state'
+# Rarely changing reference data, see resources.reference_data
+REFERENCE_DATA = 'reference-data'
+# Unit and resource group permissions of users, see resources.models.permissions
+PERMISSIONS = 'permissions'
+
+
+def _new_generation():
+    return int(time.time() * 1000)
+
+
+def is_cache_shared():
+    """
+    Return True if the default cache is shared by all the processes
+
+    RESPA_SHARED_CACHE overrides the check of the cache backend.
+
+    :rtype: bool
+    """
+    shared = getattr(settings, 'RESPA_SHARED_CACHE', None)
+    if shared is not None:
+        return shared
+    return not isinstance(cache, (LocMemCache, DummyCache))
+
+
+def get_generation(namespace):
+    """
+    Return the current generation of the namespace
+
+    :type namespace: str
+    :rtype: int
+    """
+    key = GENERATION_KEY % namespace
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _new_generation(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(namespace):
+    """
+    Invalidate all the cache entries of the namespace
+
+    :type namespace: str
+    """
+    key = GENERATION_KEY % namespace
+    try:
+        cache.incr(key)
+    except ValueError:
+        # the generation was never set or it has been evicted
+        cache.add(key, _new_generation(), None)
+    cache.set(GENERATION_TIME_KEY % namespace, _new_generation(), None)
+
+
+def get_generation_time(namespace):
+    """
+    Return the time of the latest change in the namespace
+
+    :type namespace: str
+    :rtype: datetime.datetime
+    """
+    timestamp = cache.get(GENERATION_TIME_KEY % namespace) or get_generation(namespace)
+    return datetime.datetime.fromtimestamp(timestamp / 1000, timezone.utc)
+
+
+def make_key(namespace, *parts):
+    """
+    Return a cache key for the parts in the current generation of the namespace
+
+    The parts are hashed, so they can contain any characters.
+
+    :type namespace: str
+    :rtype: str
+    """
+    digest = hashlib.sha1('\0'.join(str(part) for part in parts).encode('utf8')).hexdigest()
+    return 'respa:%s:%s:%s' % (namespace, get_generation(namespace), digest)
@@ -0,0 +1,248 @@
+"""
+Free time calculation for resources.
+
+The functions in this module load the opening hours and the reservations of
+one or more resources for a whole time range with a fixed number of queries
+and then compute the free intervals with a single sorted sweep per resource.
+"""
+import datetime
+from collections import OrderedDict
+
+import pytz
+from django.utils import timezone
+
+from .models import Reservation, ResourceDailyOpeningHours
+
+
+def sweep_free_intervals(open_intervals, busy_intervals, duration=None):
+    """
+    Subtract busy intervals from open intervals
+
+    Both arguments are iterables of (begin, end) tuples. The open intervals
+    must not overlap each other, the busy intervals may. Free intervals
+    shorter than the optional duration are left out.
+
+    :type open_intervals: list[tuple[datetime.datetime, datetime.datetime]]
+    :type busy_intervals: list[tuple[datetime.datetime, datetime.datetime]]
+    :type duration: datetime.timedelta | None
+    :rtype: list[tuple[datetime.datetime, datetime.datetime]]
+    """
+    open_intervals = sorted(open_intervals)
+    busy_intervals = sorted(busy_intervals)
+
+    free = []
+
+    def add_free(begin, end):
+        if end <= begin:
+            return
+        if duration and end - begin < duration:
+            return
+        free.append((begin, end))
+
+    first_busy = 0
+    for opens, closes in open_intervals:
+        cursor = opens
+        # Busy intervals are sorted by their beginning, so the ones that have
+        # ended before this open interval are not needed anymore.
+        while first_busy < len(busy_intervals) and busy_intervals[first_busy][1] <= cursor:
+            first_busy += 1
+
+        idx = first_busy
+        while idx < len(busy_intervals) and cursor < closes:
+            busy_begin, busy_end = busy_intervals[idx]
+            if busy_begin >= closes:
+                break
+            if busy_begin > cursor:
+                add_free(cursor, busy_begin)
+            if busy_end > cursor:
+                cursor = busy_end
+            idx += 1
+
+        add_free(cursor, closes)
+
+    return free
+
+
+def load_opening_hours(resource_ids, begin, end):
+    """
+    Return the opening hours overlapping the given range, clipped to it
+
+    :rtype: dict[str, list[tuple[datetime.datetime, datetime.datetime]]]
+    """
+    hours = ResourceDailyOpeningHours.objects.filter(
+        resource__in=resource_ids, open_between__overlap=(begin, end, '[)')
+    ).values_list('resource_id', 'open_between')
+
+    hours_by_resource = {}
+    for resource_id, open_between in hours:
+        opens = max(open_between.lower, begin)
+        closes = min(open_between.upper, end)
+        hours_by_resource.setdefault(resource_id, []).append((opens, closes))
+    return hours_by_resource
+
+
+def load_reservations(resource_ids, begin, end, exclude_reservation=None):
+    """
+    Return the current reservations overlapping the given range
+
+    :rtype: dict[str, list[tuple[datetime.datetime, datetime.datetime]]]
+    """
+    reservations = Reservation.objects.filter(
+        resource__in=resource_ids, end__gt=begin, begin__lt=end
+    ).current()
+    if exclude_reservation is not None and exclude_reservation.pk:
+        reservations = reservations.exclude(pk=exclude_reservation.pk)
+
+    reservations_by_resource = {}
+    for resource_id, rv_begin, rv_end in reservations.values_list('resource_id', 'begin', 'end'):
+        reservations_by_resource.setdefault(resource_id, []).append((rv_begin, rv_end))
+    return reservations_by_resource
+
+
+def has_reservation_collision(resource_id, begin, end, reservation=None):
+    """
+    Return True if the resource has current reservations overlapping the range
+
+    The optional reservation is disregarded, like in get_free_hours().
+
+    :type resource_id: str
+    :type begin: datetime.datetime
+    :type end: datetime.datetime
+    :type reservation: resources.models.Reservation | None
+    :rtype: bool
+    """
+    return bool(load_reservations([resource_id], begin, end, reservation))
+
+
+def get_free_hours(resource_ids, begin, end, duration=None, reservation=None, during_closing=False, tz=None):
+    """
+    Return the free intervals of the given resources in the given range
+
+    The opening hours and the reservations of all the resources are loaded
+    with one query each. If during_closing is True, opening hours are not
+    taken into account and the whole range is considered open. The optional
+    reservation is disregarded, which is useful when moving an existing
+    reservation.
+
+    Returns an ordered dict keyed by resource id, where the values are lists
+    of dicts with the keys 'starts' and 'ends'.
+
+    :type resource_ids: list[str]
+    :type begin: datetime.datetime
+    :type end: datetime.datetime
+    :type duration: datetime.timedelta | None
+    :type reservation: resources.models.Reservation | None
+    :type during_closing: bool
+    :type tz: datetime.tzinfo | None
+    :rtype: collections.OrderedDict[str, list[dict[str, datetime.datetime]]]
+    """
+    if tz is None:
+        tz = timezone.get_current_timezone()
+    resource_ids = list(resource_ids)
+
+    if during_closing:
+        hours_by_resource = {resource_id: [(begin, end)] for resource_id in resource_ids}
+    else:
+        hours_by_resource = load_opening_hours(resource_ids, begin, end)
+
+    # Resources that are never open in the range can't have free time.
+    open_resource_ids = [resource_id for resource_id in resource_ids if hours_by_resource.get(resource_id)]
+    if open_resource_ids:
+        reservations_by_resource = load_reservations(open_resource_ids, begin, end, reservation)
+    else:
+        reservations_by_resource = {}
+
+    free_by_resource = OrderedDict()
+    for resource_id in resource_ids:
+        free = sweep_free_intervals(
+            hours_by_resource.get(resource_id, []), reservations_by_resource.get(resource_id, []), duration
+        )
+        free_by_resource[resource_id] = [
+            {'starts': starts.astimezone(tz), 'ends': ends.astimezone(tz)} for starts, ends in free
+        ]
+    return free_by_resource
+
+
+def localize_range(begin, end, tz=None):
+    """
+    Localize naive begin and end times to the given or the current time zone
+    """
+    if tz is None:
+        tz = timezone.get_current_timezone()
+    elif isinstance(tz, str):
+        tz = pytz.timezone(tz)
+    if not begin.tzinfo:
+        begin = tz.localize(begin)
+    if not end.tzinfo:
+        end = tz.localize(end)
+    return begin, end
+
+
+def get_default_range():
+    """
+    Return the range from the beginning of today to the beginning of tomorrow
+    """
+    today = timezone.localtime(timezone.now()).date()
+    midnight = datetime.time(0, 0)
+    begin = datetime.datetime.combine(today, midnight)
+    return localize_range(begin, begin + datetime.timedelta(days=1))
+
+
+FREE_SLOT_SQL = '''
+WITH hours AS (
+    SELECT resource_id,
+           greatest(lower(open_between), %s) AS opens,
+           least(upper(open_between), %s) AS closes
+    FROM {hours_table}
+    WHERE open_between && tstzrange(%s, %s, '[)'){candidate_filter}
+),
+reserved AS (
+    SELECT hours.resource_id, hours.opens, hours.closes, rv."begin", rv."end",
+           max(rv."end") OVER (
+               PARTITION BY hours.resource_id, hours.opens ORDER BY rv."begin"
+               ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+           ) AS previous_end,
+           max(rv."end") OVER (PARTITION BY hours.resource_id, hours.opens) AS last_end
+    FROM hours
+    LEFT JOIN {reservation_table} rv
+        ON rv.resource_id = hours.resource_id AND rv."begin" < hours.closes AND rv."end" > hours.opens
+        AND rv.state NOT IN %s
+)
+SELECT DISTINCT resource_id FROM reserved
+WHERE ("begin" IS NULL AND closes - opens >= %s)
+   OR ("begin" IS NOT NULL AND "begin" - greatest(coalesce(previous_end, opens), opens) >= %s)
+   OR ("begin" IS NOT NULL AND closes - greatest(last_end, opens) >= %s)
+'''
+
+
+def get_free_slot_resource_ids_sql(start, end, duration, resources=None):
+    """
+    Return SQL and params selecting the ids of resources that have a free slot
+
+    A resource has a free slot if there is a gap of at least the given
+    duration between its current reservations inside some of its opening
+    hours within the range. The gaps are computed in the database with window
+    functions over the reservations of each opening hours range. If the
+    resources queryset is given, only the opening hours of those resources
+    are looked at, so the cost scales with the candidates and not with all
+    the resources.
+
+    :type start: datetime.datetime
+    :type end: datetime.datetime
+    :type duration: datetime.timedelta
+    :type resources: django.db.models.QuerySet | None
+    :rtype: tuple[str, list]
+    """
+    candidate_filter = ''
+    candidate_params = []
+    if resources is not None:
+        candidate_sql, candidate_params = resources.order_by().values('id').query.sql_with_params()
+        candidate_filter = '\n      AND resource_id IN (%s)' % candidate_sql
+    sql = FREE_SLOT_SQL.format(
+        hours_table=ResourceDailyOpeningHours._meta.db_table,
+        reservation_table=Reservation._meta.db_table,
+        candidate_filter=candidate_filter,
+    )
+    inactive_states = (Reservation.CANCELLED, Reservation.DENIED)
+    params = [start, end, start, end] + list(candidate_params) + [inactive_states, duration, duration, duration]
+    return sql, params
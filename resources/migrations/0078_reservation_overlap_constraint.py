@@ -0,0 +1,75 @@
+# Generated by Django 1.11.29 on 2026-10-18 12:30
+from __future__ import unicode_literals
+
+import logging
+
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+INACTIVE_STATES = ('cancelled', 'denied')
+
+# Active reservations that overlap another active reservation of the same resource
+OVERLAPPING_RESERVATIONS_SQL = """
+    SELECT r.id FROM resources_reservation r
+    WHERE r.state NOT IN %s AND EXISTS (
+        SELECT 1 FROM resources_reservation o
+        WHERE o.resource_id = r.resource_id AND o.id != r.id AND o.state NOT IN %s
+        AND o."begin" < r."end" AND o."end" > r."begin"
+    )
+"""
+
+
+def deny_overlapping_reservations(apps, schema_editor):
+    """
+    Deny the later of overlapping active reservations so that the constraint can be added
+
+    The reservations are kept in the order they were made, so of overlapping
+    reservations the one with the lowest id stays and the others are denied.
+    """
+    Reservation = apps.get_model('resources', 'Reservation')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(OVERLAPPING_RESERVATIONS_SQL, [INACTIVE_STATES, INACTIVE_STATES])
+        overlapping_ids = [row[0] for row in cursor.fetchall()]
+    if not overlapping_ids:
+        return
+
+    kept = {}
+    denied_ids = []
+    reservations = Reservation.objects.filter(id__in=overlapping_ids).order_by('id')
+    for reservation in reservations.only('id', 'resource_id', 'begin', 'end'):
+        resource_kept = kept.setdefault(reservation.resource_id, [])
+        if any(begin < reservation.end and end > reservation.begin for begin, end in resource_kept):
+            denied_ids.append(reservation.id)
+        else:
+            resource_kept.append((reservation.begin, reservation.end))
+
+    if denied_ids:
+        logger.warning('Denying reservations that overlap earlier reservations: %s',
+                       ', '.join(str(pk) for pk in denied_ids))
+        Reservation.objects.filter(id__in=denied_ids).update(state='denied')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0076_auto_20200610_1657'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.RunPython(deny_overlapping_reservations, migrations.RunPython.noop),
+        migrations.RunSQL(
+            """UPDATE resources_reservation SET duration = tstzrange("begin", "end", '[)') WHERE duration IS NULL""",
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            """
+            ALTER TABLE resources_reservation ADD CONSTRAINT resources_reservation_no_overlap
+            EXCLUDE USING gist (resource_id WITH =, duration WITH &&)
+            WHERE (state NOT IN ('cancelled', 'denied'))
+            """,
+            "ALTER TABLE resources_reservation DROP CONSTRAINT resources_reservation_no_overlap",
+        ),
+    ]
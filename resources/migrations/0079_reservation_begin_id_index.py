@@ -0,0 +1,18 @@
+# Generated by Django 1.11.29 on 2026-10-18 13:00
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0078_reservation_overlap_constraint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['begin', 'id'], name='reservation_begin_id_idx'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 1.11.29 on 2026-10-18 14:00
+from __future__ import unicode_literals
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# The SQL of resources.search as it was when the columns were added
+POPULATE_SEARCH_VECTORS_SQL = '''
+UPDATE resources_resource AS target SET
+    search_vector_fi =
+        setweight(to_tsvector('finnish', coalesce(r.name_fi, '')), 'A') ||
+        setweight(to_tsvector('finnish', concat_ws(' ', u.name_fi, eq.names_fi)), 'B') ||
+        setweight(to_tsvector('finnish', concat_ws(' ', r.description_fi, u.description_fi, eq.descriptions_fi)), 'C'),
+    search_vector_sv =
+        setweight(to_tsvector('swedish', coalesce(r.name_sv, '')), 'A') ||
+        setweight(to_tsvector('swedish', concat_ws(' ', u.name_sv, eq.names_sv)), 'B') ||
+        setweight(to_tsvector('swedish', concat_ws(' ', r.description_sv, u.description_sv, eq.descriptions_sv)), 'C'),
+    search_vector_en =
+        setweight(to_tsvector('english', coalesce(r.name_en, '')), 'A') ||
+        setweight(to_tsvector('english', concat_ws(' ', u.name_en, eq.names_en)), 'B') ||
+        setweight(to_tsvector('english', concat_ws(' ', r.description_en, u.description_en, eq.descriptions_en)), 'C')
+FROM resources_resource r
+LEFT JOIN resources_unit u ON u.id = r.unit_id
+LEFT JOIN LATERAL (
+    SELECT
+        string_agg(concat_ws(' ', e.name_fi, e.name, (
+            SELECT string_agg(a.name, ' ') FROM resources_equipmentalias a
+            WHERE a.equipment_id = e.id AND a.language = 'fi'
+        )), ' ') AS names_fi,
+        string_agg(re.description_fi, ' ') AS descriptions_fi,
+        string_agg(concat_ws(' ', e.name_sv, e.name, (
+            SELECT string_agg(a.name, ' ') FROM resources_equipmentalias a
+            WHERE a.equipment_id = e.id AND a.language = 'sv'
+        )), ' ') AS names_sv,
+        string_agg(re.description_sv, ' ') AS descriptions_sv,
+        string_agg(concat_ws(' ', e.name_en, e.name, (
+            SELECT string_agg(a.name, ' ') FROM resources_equipmentalias a
+            WHERE a.equipment_id = e.id AND a.language = 'en'
+        )), ' ') AS names_en,
+        string_agg(re.description_en, ' ') AS descriptions_en
+    FROM resources_resourceequipment re
+    JOIN resources_equipment e ON e.id = re.equipment_id
+    WHERE re.resource_id = r.id
+) eq ON true
+WHERE target.id = r.id
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0079_reservation_begin_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resource',
+            name='search_vector_en',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='search_vector_fi',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='search_vector_sv',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector_fi'], name='resource_search_fi_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector_sv'], name='resource_search_sv_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector_en'], name='resource_search_en_gin'),
+        ),
+        migrations.RunSQL(POPULATE_SEARCH_VECTORS_SQL, migrations.RunSQL.noop),
+    ]
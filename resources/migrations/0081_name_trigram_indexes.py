@@ -0,0 +1,28 @@
+# Generated by Django 1.11.29 on 2026-10-18 15:00
+from __future__ import unicode_literals
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# The expressions match the ones Django uses for istartswith and icontains.
+TRIGRAM_INDEXES = [
+    ('resource_name_%s_trgm' % lang, 'resources_resource', 'name_%s' % lang) for lang in ('fi', 'en', 'sv')
+] + [
+    ('unit_name_%s_trgm' % lang, 'resources_unit', 'name_%s' % lang) for lang in ('fi', 'en', 'sv')
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0080_resource_search_vectors'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+    ] + [
+        migrations.RunSQL(
+            'CREATE INDEX %s ON %s USING gin ((UPPER(%s::text)) gin_trgm_ops)' % (name, table, column),
+            'DROP INDEX %s' % name,
+        ) for name, table, column in TRIGRAM_INDEXES
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 1.11.29 on 2026-10-18 16:00
+from __future__ import unicode_literals
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0081_name_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resource',
+            name='effective_location',
+            field=django.contrib.gis.db.models.fields.PointField(editable=False, null=True, spatial_index=False,
+                                                                 srid=4326),
+        ),
+        migrations.RunSQL(
+            'UPDATE resources_resource r SET effective_location = coalesce('
+            'r.location, (SELECT u.location FROM resources_unit u WHERE u.id = r.unit_id))',
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX resource_effective_location_geog ON resources_resource '
+            'USING gist ((effective_location::geography))',
+            'DROP INDEX resource_effective_location_geog',
+        ),
+    ]
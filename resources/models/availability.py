@@ -25,7 +25,51 @@ def datetime_to_date(dt, tz):
     return dt.date()
 
 
-def get_opening_hours(time_zone, periods, begin, end=None):
+def resolve_period_days(periods, begin, end):
+    """
+    Return the period deciding each day from begin to end (inclusive)
+
+    The periods must be in the order of precedence. Every period is assigned
+    to the days of its range that no earlier period has taken yet, and days
+    that are already taken are skipped with a "next free day" disjoint-set,
+    so the work is roughly linear in the number of days and periods instead
+    of scanning every period for every day.
+
+    Returns a list with an item per day, which is None for the days that no
+    period covers.
+
+    :type periods: list[Period]
+    :type begin: datetime.date
+    :type end: datetime.date
+    :rtype: list[Period | None]
+    """
+    day_count = (end - begin).days + 1
+    assigned = [None] * day_count
+    # next_free[i] points towards the first day at or after i that has not
+    # been assigned yet; the extra item at the end is a sentinel.
+    next_free = list(range(day_count + 1))
+
+    def find_free(idx):
+        root = idx
+        while next_free[root] != root:
+            root = next_free[root]
+        while next_free[idx] != root:
+            next_free[idx], idx = root, next_free[idx]
+        return root
+
+    for period in periods:
+        first = max((period.start - begin).days, 0)
+        last = min((period.end - begin).days, day_count - 1)
+        idx = find_free(first) if first < day_count else day_count
+        while idx <= last:
+            assigned[idx] = period
+            next_free[idx] = idx + 1
+            idx = find_free(idx + 1)
+
+    return assigned
+
+
+def get_opening_hours(time_zone, periods, begin, end=None, days=None):
     """
     Returns opening and closing times for a given date range
 
@@ -37,6 +81,9 @@ def get_opening_hours(time_zone, periods, begin, end=None):
     :type periods: list[Period]
     :type begin: datetime.date | datetime.datetime
     :type end: datetime.date | None
+    :param days: the Day objects of the periods, if they have been fetched already.
+                 Days prefetched with the periods are also used if this is not given.
+    :type days: list[Day] | None
     """
 
     tz = pytz.timezone(time_zone)
@@ -65,32 +112,32 @@ def get_opening_hours(time_zone, periods, begin, end=None):
             p.priority = 0
     periods.sort(key=lambda x: (-x.priority, x.end - x.start))
 
-    days = list(Day.objects.filter(period__in=periods))
+    if days is None:
+        if all('days' in getattr(p, '_prefetched_objects_cache', {}) for p in periods):
+            days = [day for p in periods for day in p.days.all()]
+        else:
+            days = list(Day.objects.filter(period__in=periods))
+    days_by_period = {}
+    for day in days:
+        days_by_period.setdefault(day.period_id, {})[day.weekday] = day
     for period in periods:
-        period.range_days = {day.weekday: day for day in days if day.period_id == period.id}
+        period.range_days = days_by_period.get(period.id, {})
 
     date = begin
     dates = OrderedDict()
-    while date <= end:
+    for period in resolve_period_days(periods, begin, end):
         opens = None
         closes = None
-        for period in periods:
-            if period.start > date or period.end < date:
-                continue
-            # Currently the 'closed' field of periods do not
-            # always contain sensible data. Ignore it for now.
-            if False and period.closed:
-                break
-            day = period.range_days.get(date.weekday())
-            if day is None or day.closed:
-                break
+        # Currently the 'closed' field of periods do not
+        # always contain sensible data, so it is ignored.
+        day = period.range_days.get(date.weekday()) if period else None
+        if day is not None and not day.closed:
             opens = combine_datetime(date, day.opens, tz)
             closes = combine_datetime(date, day.closes, tz)
             if opens == closes:
                 # The interval is zero-length
                 opens = None
                 closes = None
-            break
 
         dates[date] = [{'opens': opens, 'closes': closes}]
         date += datetime.timedelta(days=1)
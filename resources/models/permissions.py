@@ -1,4 +1,11 @@
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.db.models import Q
 from django.utils.translation import ugettext_lazy as _
+from guardian.models import GroupObjectPermission, UserObjectPermission
+
+from resources.cache import PERMISSIONS, is_cache_shared, make_key
 
 RESOURCE_PERMISSIONS = (
     ('can_approve_reservation', _('Can approve reservation')),
@@ -11,3 +18,83 @@ RESOURCE_PERMISSIONS = (
     ('can_view_reservation_catering_orders', _('Can view reservation catering orders')),
     ('can_modify_reservation_catering_orders', _('Can modify reservation catering orders')),
 )
+
+
+class PermissionMatrix(object):
+    """
+    The unit and resource group permissions of a user
+
+    Object permissions are stored as a mapping of permission codename (like
+    "unit:can_make_reservations") to the set of primary keys of the objects
+    the permission is held for, directly or through the user's groups. Global
+    permissions are the codenames the user holds for all the objects.
+    """
+
+    def __init__(self, user_id, object_perms=None, global_perms=None, is_superuser=False):
+        self.user_id = user_id
+        self.object_perms = object_perms or {}
+        self.global_perms = global_perms or set()
+        self.is_superuser = is_superuser
+
+    def has_object_perm(self, perm, obj_pk):
+        """
+        Check the permission the same way as guardian's ObjectPermissionChecker
+
+        :type perm: str
+        :rtype: bool
+        """
+        if self.is_superuser:
+            return True
+        return obj_pk is not None and str(obj_pk) in self.object_perms.get(perm, ())
+
+    def get_object_pks(self, perm):
+        """
+        :type perm: str
+        :rtype: set[str]
+        """
+        return self.object_perms.get(perm, set())
+
+    def has_global_perm(self, perm):
+        return perm in self.global_perms
+
+
+def build_permission_matrix(user):
+    """
+    Load the permission matrix of the user from the database
+
+    :rtype: PermissionMatrix
+    """
+    # guardian doesn't give inactive users any permissions
+    if not user.is_active:
+        return PermissionMatrix(user.pk)
+
+    object_perms = {}
+    content_types = dict(content_type__app_label='resources', content_type__model__in=('unit', 'resourcegroup'))
+    for queryset in (UserObjectPermission.objects.filter(user=user),
+                     GroupObjectPermission.objects.filter(group__user=user)):
+        for codename, object_pk in queryset.filter(**content_types).values_list('permission__codename', 'object_pk'):
+            object_perms.setdefault(codename, set()).add(object_pk)
+
+    global_perms = Permission.objects.filter(Q(user=user) | Q(group__user=user), **content_types)
+    global_perms = set(global_perms.values_list('codename', flat=True))
+    return PermissionMatrix(user.pk, object_perms, global_perms, is_superuser=user.is_superuser)
+
+
+def get_permission_matrix(user):
+    """
+    Return the permission matrix of the user, cached until permissions change
+
+    A revoked permission must not be granted by a process that hasn't seen the
+    change, so the matrix is cached only if the cache is shared.
+
+    :rtype: PermissionMatrix
+    """
+    timeout = getattr(settings, 'RESPA_PERMISSION_CACHE_TIMEOUT', None)
+    if not timeout or not is_cache_shared():
+        return build_permission_matrix(user)
+    key = make_key(PERMISSIONS, user.pk, user.is_active, user.is_superuser)
+    matrix = cache.get(key)
+    if matrix is None:
+        matrix = build_permission_matrix(user)
+        cache.set(key, matrix, timeout)
+    return matrix
@@ -39,6 +39,20 @@ RESERVATION_EXTRA_FIELDS = ('reserver_name', 'reserver_phone_number', 'reserver_
                             'number_of_participants', 'participants', 'reserver_email_address', 'host_name')
 
 
+# Name of the database constraint that prevents overlapping active reservations of a resource
+RESERVATION_OVERLAP_CONSTRAINT = 'resources_reservation_no_overlap'
+
+
+def is_reservation_overlap_error(exc):
+    """
+    Return True if the IntegrityError is a violation of the reservation overlap constraint
+
+    :type exc: django.db.IntegrityError
+    :rtype: bool
+    """
+    return RESERVATION_OVERLAP_CONSTRAINT in str(exc)
+
+
 class ReservationQuerySet(models.QuerySet):
     def current(self):
         return self.exclude(state__in=(Reservation.CANCELLED, Reservation.DENIED))
@@ -60,6 +74,17 @@ class ReservationQuerySet(models.QuerySet):
         end_dt = start_dt + datetime.timedelta(days=1)
         return self.overlaps(start_dt, end_dt)
 
+    def visible_for(self, user):
+        # staff members can see all reservations
+        if user.is_staff:
+            return self
+
+        # normal users can see only their own reservations and reservations that are confirmed or requested
+        filters = Q(state__in=(Reservation.CONFIRMED, Reservation.REQUESTED))
+        if user.is_authenticated:
+            filters |= Q(user=user)
+        return self.filter(filters).filter(resource__in=Resource.objects.visible_for(user))
+
     def extra_fields_visible(self, user):
         # the following logic is also implemented in Reservation.are_extra_fields_visible()
         # so if this is changed that probably needs to be changed as well
@@ -151,6 +176,10 @@ class Reservation(ModifiableModel):
         verbose_name = _("reservation")
         verbose_name_plural = _("reservations")
         ordering = ('id',)
+        indexes = [
+            # keyset for cursor pagination
+            models.Index(fields=['begin', 'id'], name='reservation_begin_id_idx'),
+        ]
 
     def _save_dt(self, attr, dt):
         """
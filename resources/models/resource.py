@@ -5,8 +5,8 @@ import pytz
 from collections import OrderedDict
 from decimal import Decimal
 
-import arrow
 import django.db.models as dbm
+from django.db import connection
 from django.db.models import Q
 from django.apps import apps
 from django.conf import settings
@@ -14,27 +14,27 @@ from django.contrib.gis.db import models
 from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
 from django.core.validators import MinValueValidator
-from django.utils import timezone
 from django.utils.crypto import get_random_string
 from django.utils.six import BytesIO
 from django.utils.translation import ugettext_lazy as _
 from django.utils.translation import pgettext_lazy
 from django.contrib.postgres.fields import HStoreField, DateTimeRangeField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from .gistindex import GistIndex
 from psycopg2.extras import DateTimeTZRange
 from image_cropping import ImageRatioField
 from PIL import Image
-from guardian.shortcuts import get_objects_for_user, get_users_with_perms
-from guardian.core import ObjectPermissionChecker
+from guardian.shortcuts import get_users_with_perms
 
 from resources.errors import InvalidImage
+from resources.signals import opening_hours_updated
 
 from .base import AutoIdentifiedModel, NameIdentifiedModel, ModifiableModel
 from .utils import create_reservable_before_datetime, get_translated, get_translated_name, humanize_duration
 from .equipment import Equipment
-from .unit import Unit
 from .availability import get_opening_hours
-from .permissions import RESOURCE_PERMISSIONS
+from .permissions import RESOURCE_PERMISSIONS, get_permission_matrix
 
 
 def generate_access_code(access_code_type):
@@ -128,11 +128,23 @@ class ResourceQuerySet(models.QuerySet):
             return self.filter(public=True)
 
     def with_perm(self, perm, user):
-        units = get_objects_for_user(user, 'unit:%s' % perm, klass=Unit,
-                                     with_superuser=False)
-        resource_groups = get_objects_for_user(user, 'group:%s' % perm, klass=ResourceGroup,
-                                               with_superuser=False)
-        return self.filter(Q(unit__in=units) | Q(groups__in=resource_groups)).distinct()
+        if not (user and user.is_authenticated):
+            return self.none()
+        matrix = get_permission_matrix(user)
+
+        unit_perm = 'unit:%s' % perm
+        if matrix.has_global_perm(unit_perm):
+            unit_q = Q(unit__isnull=False)
+        else:
+            unit_q = Q(unit__in=matrix.get_object_pks(unit_perm))
+
+        # Filtering through the memberships instead of joining the groups
+        # makes DISTINCT unnecessary.
+        group_perm = 'group:%s' % perm
+        memberships = ResourceGroup.resources.through.objects.all()
+        if not matrix.has_global_perm(group_perm):
+            memberships = memberships.filter(resourcegroup__in=matrix.get_object_pks(group_perm))
+        return self.filter(unit_q | Q(id__in=memberships.values('resource_id')))
 
 
 class Resource(ModifiableModel, AutoIdentifiedModel):
@@ -165,6 +177,10 @@ class Resource(ModifiableModel, AutoIdentifiedModel):
 
     # if not set, location is inherited from unit
     location = models.PointField(verbose_name=_('Location'), null=True, blank=True, srid=settings.DEFAULT_SRID)
+    # location, or the location of the unit if not set. Indexed as geography in
+    # the migrations for nearest neighbour searches.
+    effective_location = models.PointField(null=True, editable=False, srid=settings.DEFAULT_SRID,
+                                           spatial_index=False)
 
     min_period = models.DurationField(verbose_name=_('Minimum reservation time'),
                                       default=datetime.timedelta(minutes=30))
@@ -197,14 +213,31 @@ class Resource(ModifiableModel, AutoIdentifiedModel):
     ceepos_payment_required = models.BooleanField(verbose_name=_('Ceepos payment required'), default=False)
     product_code = models.CharField(verbose_name=_('Product code'), null=False, blank=True, max_length=25, default='')
 
+    # Full-text search documents, maintained by resources.search
+    search_vector_fi = SearchVectorField(null=True, editable=False)
+    search_vector_sv = SearchVectorField(null=True, editable=False)
+    search_vector_en = SearchVectorField(null=True, editable=False)
+
     class Meta:
         verbose_name = _("resource")
         verbose_name_plural = _("resources")
         ordering = ('unit', 'name',)
+        indexes = [
+            GinIndex(fields=['search_vector_fi'], name='resource_search_fi_gin'),
+            GinIndex(fields=['search_vector_sv'], name='resource_search_sv_gin'),
+            GinIndex(fields=['search_vector_en'], name='resource_search_en_gin'),
+        ]
 
     def __str__(self):
         return "%s (%s)/%s" % (get_translated(self, 'name'), self.id, self.unit)
 
+    def save(self, *args, **kwargs):
+        if self.location is not None:
+            self.effective_location = self.location
+        else:
+            self.effective_location = self.unit.location if self.unit_id else None
+        super().save(*args, **kwargs)
+
     def validate_reservation_period(self, reservation, user, data=None):
         """
         Check that given reservation if valid for given user.
@@ -275,27 +308,35 @@ class Resource(ModifiableModel, AutoIdentifiedModel):
 
         max_count = self.max_reservations_per_user
         if max_count is not None:
+            # Concurrent reservations of the same user for the same resource are
+            # serialized until the end of the transaction, so that they can't all
+            # pass the check.
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))',
+                               ['resources.reservation_limit:%s:%s' % (self.pk, user.pk)])
             reservation_count = self.reservations.filter(user=user).active().count()
             if reservation_count >= max_count:
                 raise ValidationError(_("Maximum number of active reservations for this resource exceeded."))
 
     def check_reservation_collision(self, begin, end, reservation):
-        overlapping = self.reservations.filter(end__gt=begin, begin__lt=end).active()
-        if reservation:
-            overlapping = overlapping.exclude(pk=reservation.pk)
-        return overlapping.exists()
+        # the same reservations as in the free hours and in the overlap constraint
+        from resources.free_time import has_reservation_collision
+        return has_reservation_collision(self.id, begin, end, reservation)
 
     def get_available_hours(self, start=None, end=None, duration=None, reservation=None, during_closing=False):
         """
         Returns hours that the resource is not reserved for a given date range
 
-        If include_closed=True, will also return hours when the resource is closed, if it is not reserved.
+        If during_closing=True, will also return hours when the resource is closed, if it is not reserved.
         This is so that admins can book resources during closing hours. Returns
         the available hours as a list of dicts. The optional reservation argument
         is for disregarding a given reservation during checking, if we wish to
         move an existing reservation. The optional duration argument specifies
         minimum length for periods to be returned.
 
+        The opening hours and reservations for the whole range are loaded at
+        once, see resources.free_time.
+
         :rtype: list[dict[str, datetime.datetime]]
         :type start: datetime.datetime
         :type end: datetime.datetime
@@ -303,74 +344,17 @@ class Resource(ModifiableModel, AutoIdentifiedModel):
         :type reservation: Reservation
         :type during_closing: bool
         """
-        today = arrow.get(timezone.now())
-        if start is None:
-            start = today.floor('day').naive
-        if end is None:
-            end = today.replace(days=+1).floor('day').naive
-        if not start.tzinfo and not end.tzinfo:
-            """
-            Only try to localize naive dates
-            """
-            tz = timezone.get_current_timezone()
-            start = tz.localize(start)
-            end = tz.localize(end)
+        from resources.free_time import get_default_range, get_free_hours, localize_range
+
+        if start is None or end is None:
+            default_start, default_end = get_default_range()
+            start = start or default_start
+            end = end or default_end
+        start, end = localize_range(start, end)
 
-        if not during_closing:
-            """
-            Check open hours only
-            """
-            open_hours = self.get_opening_hours(start, end)
-            hours_list = []
-            for date, open_during_date in open_hours.items():
-                for period in open_during_date:
-                    if period['opens']:
-                        # if the start or end straddle opening hours
-                        opens = period['opens'] if period['opens'] > start else start
-                        closes = period['closes'] if period['closes'] < end else end
-                        # include_closed to prevent recursion, opening hours need not be rechecked
-                        hours_list.extend(self.get_available_hours(start=opens,
-                                                                   end=closes,
-                                                                   duration=duration,
-                                                                   reservation=reservation,
-                                                                   during_closing=True))
-            return hours_list
-
-        reservations = self.reservations.filter(
-            end__gte=start, begin__lte=end).order_by('begin')
-        hours_list = [({'starts': start})]
-        first_checked = False
-        for res in reservations:
-            # skip the reservation that is being edited
-            if res == reservation:
-                continue
-            # check if the reservation spans the beginning
-            if not first_checked:
-                first_checked = True
-                if res.begin < start:
-                    if res.end > end:
-                        return []
-                    hours_list[0]['starts'] = res.end
-                    # proceed to the next reservation
-                    continue
-            if duration:
-                if res.begin - hours_list[-1]['starts'] < duration:
-                    # the free period is too short, discard this period
-                    hours_list[-1]['starts'] = res.end
-                    continue
-            hours_list[-1]['ends'] = timezone.localtime(res.begin)
-            # check if the reservation spans the end
-            if res.end > end:
-                return hours_list
-            hours_list.append({'starts': timezone.localtime(res.end)})
-        # after the last reservation, we must check if the remaining free period is too short
-        if duration:
-            if end - hours_list[-1]['starts'] < duration:
-                hours_list.pop()
-                return hours_list
-        # otherwise add the remaining free period
-        hours_list[-1]['ends'] = end
-        return hours_list
+        free_hours = get_free_hours([self.id], start, end, duration=duration, reservation=reservation,
+                                    during_closing=during_closing)
+        return free_hours[self.id]
 
     def get_opening_hours(self, begin=None, end=None, opening_hours_cache=None):
         """
@@ -405,15 +389,36 @@ class Resource(ModifiableModel, AutoIdentifiedModel):
 
         return opening_hours
 
-    def update_opening_hours(self):
-        hours = self.opening_hours.order_by('open_between')
+    def update_opening_hours(self, begin=None, end=None):
+        """
+        Update the materialized ResourceDailyOpeningHours of the resource
+
+        If begin and end dates are given, only the opening hours of the days
+        between them (inclusive) are recomputed, and only the rows that have
+        changed on those days are deleted or added. Otherwise the whole span of
+        the periods is recomputed and the hours outside it are deleted.
+
+        :type begin: datetime.date | None
+        :type end: datetime.date | None
+        """
+        hours = self.opening_hours.all()
+        unit_periods = self.unit.periods.all()
+        resource_periods = self.periods.all()
+
+        scoped = begin is not None and end is not None
+        if scoped:
+            assert begin <= end
+            hours = filter_opening_hours_by_dates(hours, begin, end, pytz.timezone(self.unit.time_zone))
+            unit_periods = unit_periods.filter(start__lte=end, end__gte=begin)
+            resource_periods = resource_periods.filter(start__lte=end, end__gte=begin)
+
         existing_hours = {}
-        for h in hours:
-            assert h.open_between.lower not in existing_hours
-            existing_hours[h.open_between.lower] = h.open_between.upper
+        for hours_id, open_between in hours.values_list('id', 'open_between'):
+            assert open_between.lower not in existing_hours
+            existing_hours[open_between.lower] = (open_between.upper, hours_id)
 
-        unit_periods = list(self.unit.periods.all())
-        resource_periods = list(self.periods.all())
+        unit_periods = list(unit_periods)
+        resource_periods = list(resource_periods)
 
         # Periods set for the resource always carry a higher priority. If
         # nothing is defined for the resource for a given day, use the
@@ -423,19 +428,14 @@ class Resource(ModifiableModel, AutoIdentifiedModel):
         for period in resource_periods:
             period.priority = 1
 
-        earliest_date = None
-        latest_date = None
         all_periods = unit_periods + resource_periods
-        for period in all_periods:
-            if earliest_date is None or period.start < earliest_date:
-                earliest_date = period.start
-            if latest_date is None or period.end > latest_date:
-                latest_date = period.end
-
-        # Assume we delete everything, but remove items from the delete
-        # list if the hours are identical.
-        to_delete = existing_hours
-        to_add = {}
+        if scoped:
+            earliest_date = begin
+            latest_date = end
+        else:
+            earliest_date, latest_date = get_periods_date_range(all_periods)
+
+        new_hours = {}
         if all_periods:
             hours = get_opening_hours(self.unit.time_zone, all_periods,
                                       earliest_date, latest_date)
@@ -443,25 +443,22 @@ class Resource(ModifiableModel, AutoIdentifiedModel):
                 for h in hours_items:
                     if not h['opens'] or not h['closes']:
                         continue
-                    if h['opens'] in to_delete and h['closes'] == to_delete[h['opens']]:
-                            del to_delete[h['opens']]
-                            continue
-                    to_add[h['opens']] = h['closes']
+                    new_hours[h['opens']] = h['closes']
 
+        to_delete, to_add = diff_opening_hours(existing_hours, new_hours)
         if to_delete:
-            ret = ResourceDailyOpeningHours.objects.filter(
-                open_between__in=[(opens, closes, '[)') for opens, closes in to_delete.items()],
-                resource=self
-            ).delete()
+            ret = ResourceDailyOpeningHours.objects.filter(id__in=to_delete).delete()
             assert ret[0] == len(to_delete)
 
         add_objs = [
             ResourceDailyOpeningHours(resource=self, open_between=(opens, closes, '[)'))
-            for opens, closes in to_add.items()
+            for opens, closes in to_add
         ]
         if add_objs:
             ResourceDailyOpeningHours.objects.bulk_create(add_objs)
 
+        opening_hours_updated.send(sender=self.__class__, resource_ids=[self.id], begin=earliest_date, end=latest_date)
+
     def is_admin(self, user):
         # Currently all staff members are allowed to administrate
         # all resources. Will be more finegrained in the future.
@@ -476,17 +473,15 @@ class Resource(ModifiableModel, AutoIdentifiedModel):
         # Admins are almighty.
         if self.is_admin(user) and allow_admin:
             return True
-        if hasattr(self, '_permission_checker'):
-            checker = self._permission_checker
-        else:
-            checker = ObjectPermissionChecker(user)
+        matrix = getattr(self, '_permission_matrix', None)
+        if matrix is None or matrix.user_id != user.pk:
+            matrix = get_permission_matrix(user)
 
         # Permissions can be given per-unit
-        if checker.has_perm('unit:%s' % perm, self.unit):
+        if matrix.has_object_perm('unit:%s' % perm, self.unit_id):
             return True
         # ... or through Resource Groups
-        resource_group_perms = [checker.has_perm('group:%s' % perm, rg) for rg in self.groups.all()]
-        return any(resource_group_perms)
+        return any(matrix.has_object_perm('group:%s' % perm, rg.pk) for rg in self.groups.all())
 
     def get_users_with_perm(self, perm):
         users = {u for u in get_users_with_perms(self.unit) if u.has_perm('unit:%s' % perm, self.unit)}
@@ -533,18 +528,16 @@ class Resource(ModifiableModel, AutoIdentifiedModel):
     def get_supported_reservation_extra_field_names(self, cache=None):
         if not self.reservation_metadata_set_id:
             return []
-        if cache:
-            metadata_set = cache[self.reservation_metadata_set_id]
-        else:
+        metadata_set = cache.get(self.reservation_metadata_set_id) if cache else None
+        if metadata_set is None:
             metadata_set = self.reservation_metadata_set
         return [x.field_name for x in metadata_set.supported_fields.all()]
 
     def get_required_reservation_extra_field_names(self, cache=None):
-        if not self.reservation_metadata_set:
+        if not self.reservation_metadata_set_id:
             return []
-        if cache:
-            metadata_set = cache[self.reservation_metadata_set_id]
-        else:
+        metadata_set = cache.get(self.reservation_metadata_set_id) if cache else None
+        if metadata_set is None:
             metadata_set = self.reservation_metadata_set
         return [x.field_name for x in metadata_set.required_fields.all()]
 
@@ -683,6 +676,60 @@ class ResourceGroup(ModifiableModel):
         return self.name
 
 
+def get_periods_date_range(periods):
+    """
+    Return the earliest start and the latest end date of the periods
+
+    :type periods: list[resources.models.Period]
+    :rtype: tuple[datetime.date | None, datetime.date | None]
+    """
+    earliest_date = None
+    latest_date = None
+    for period in periods:
+        if earliest_date is None or period.start < earliest_date:
+            earliest_date = period.start
+        if latest_date is None or period.end > latest_date:
+            latest_date = period.end
+    return earliest_date, latest_date
+
+
+def filter_opening_hours_by_dates(queryset, begin, end, tz):
+    """
+    Filter ResourceDailyOpeningHours starting on the days from begin to end (inclusive)
+
+    :type begin: datetime.date
+    :type end: datetime.date
+    :type tz: datetime.tzinfo
+    """
+    midnight = datetime.time(0, 0)
+    range_begin = tz.localize(datetime.datetime.combine(begin, midnight))
+    range_end = tz.localize(datetime.datetime.combine(end + datetime.timedelta(days=1), midnight))
+    return queryset.filter(open_between__startswith__gte=range_begin, open_between__startswith__lt=range_end)
+
+
+def diff_opening_hours(existing_hours, new_hours):
+    """
+    Compare existing opening hours to newly computed ones
+
+    Returns the ids of the ResourceDailyOpeningHours rows to delete and the
+    (opens, closes) tuples to add. Rows whose hours haven't changed are kept.
+
+    :param existing_hours: opening time -> (closing time, row id)
+    :type existing_hours: dict[datetime.datetime, tuple[datetime.datetime, int]]
+    :param new_hours: opening time -> closing time
+    :type new_hours: dict[datetime.datetime, datetime.datetime]
+    :rtype: tuple[list[int], list[tuple[datetime.datetime, datetime.datetime]]]
+    """
+    to_delete = dict(existing_hours)
+    to_add = []
+    for opens, closes in new_hours.items():
+        if opens in to_delete and to_delete[opens][0] == closes:
+            del to_delete[opens]
+            continue
+        to_add.append((opens, closes))
+    return [hours_id for closes, hours_id in to_delete.values()], to_add
+
+
 class ResourceDailyOpeningHours(models.Model):
     """
     Calculated automatically for each day the resource is open
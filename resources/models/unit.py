@@ -1,3 +1,5 @@
+import datetime
+
 import pytz
 from django.conf import settings
 from django.contrib.gis.db import models
@@ -6,8 +8,9 @@ from django.utils.translation import ugettext_lazy as _
 
 from .base import AutoIdentifiedModel, ModifiableModel
 from .utils import create_reservable_before_datetime, get_translated, get_translated_name
-from .availability import get_opening_hours
+from .availability import Period, get_opening_hours
 from .permissions import RESOURCE_PERMISSIONS
+from resources.signals import opening_hours_updated
 
 from munigeo.models import Municipality
 
@@ -74,9 +77,118 @@ class Unit(ModifiableModel, AutoIdentifiedModel):
         """
         return get_opening_hours(self.time_zone, list(self.periods.all()), begin, end)
 
-    def update_opening_hours(self):
-        for res in self.resources.all():
-            res.update_opening_hours()
+    def update_opening_hours(self, begin=None, end=None, resource_ids=None):
+        """
+        Update the materialized opening hours of all the resources in the unit
+
+        The periods of the unit are resolved only once and the resources' own
+        periods are merged on top of them. The changes of all the resources
+        are then applied with a single delete and a single insert. If
+        resource_ids is given, only those resources of the unit are updated.
+
+        :type begin: datetime.date | None
+        :type end: datetime.date | None
+        :type resource_ids: list[str] | None
+        """
+        from .resource import (
+            ResourceDailyOpeningHours, diff_opening_hours, filter_opening_hours_by_dates, get_periods_date_range
+        )
+
+        resources = self.resources.all()
+        if resource_ids is not None:
+            resources = resources.filter(id__in=resource_ids)
+        resource_ids = list(resources.values_list('id', flat=True))
+        if not resource_ids:
+            return
+
+        unit_periods = self.periods.prefetch_related('days')
+        resource_periods = Period.objects.filter(resource__in=resource_ids).prefetch_related('days')
+        hours = ResourceDailyOpeningHours.objects.filter(resource__in=resource_ids)
+
+        scoped = begin is not None and end is not None
+        if scoped:
+            assert begin <= end
+            hours = filter_opening_hours_by_dates(hours, begin, end, self.get_tz())
+            unit_periods = unit_periods.filter(start__lte=end, end__gte=begin)
+            resource_periods = resource_periods.filter(start__lte=end, end__gte=begin)
+
+        existing_hours_by_resource = {resource_id: {} for resource_id in resource_ids}
+        for hours_id, resource_id, open_between in hours.values_list('id', 'resource_id', 'open_between'):
+            existing_hours = existing_hours_by_resource[resource_id]
+            assert open_between.lower not in existing_hours
+            existing_hours[open_between.lower] = (open_between.upper, hours_id)
+
+        unit_periods = list(unit_periods)
+        resource_periods = list(resource_periods)
+        periods_by_resource = {}
+        for period in resource_periods:
+            periods_by_resource.setdefault(period.resource_id, []).append(period)
+
+        if scoped:
+            earliest_date = begin
+            latest_date = end
+        else:
+            earliest_date, latest_date = get_periods_date_range(unit_periods + resource_periods)
+
+        unit_hours = self._get_hours_by_date(unit_periods, earliest_date, latest_date)
+
+        to_delete = []
+        add_objs = []
+        for resource_id in resource_ids:
+            resource_hours = unit_hours
+            own_periods = periods_by_resource.get(resource_id)
+            if own_periods:
+                resource_hours = self._merge_resource_hours(unit_hours, own_periods, earliest_date, latest_date)
+
+            new_hours = dict(resource_hours.values())
+            resource_to_delete, resource_to_add = diff_opening_hours(existing_hours_by_resource[resource_id], new_hours)
+            to_delete += resource_to_delete
+            add_objs += [
+                ResourceDailyOpeningHours(resource_id=resource_id, open_between=(opens, closes, '[)'))
+                for opens, closes in resource_to_add
+            ]
+
+        if to_delete:
+            ResourceDailyOpeningHours.objects.filter(id__in=to_delete).delete()
+        if add_objs:
+            ResourceDailyOpeningHours.objects.bulk_create(add_objs)
+
+        opening_hours_updated.send(sender=self.__class__, resource_ids=resource_ids, begin=earliest_date, end=latest_date)
+
+    def _get_hours_by_date(self, periods, begin, end):
+        """
+        Return a dict of date -> (opens, closes) for the days the periods are open
+
+        The days of the periods must have been prefetched.
+        """
+        if not periods:
+            return {}
+        hours = get_opening_hours(self.time_zone, periods, begin, end)
+        hours_by_date = {}
+        for date, hours_items in hours.items():
+            for h in hours_items:
+                if h['opens'] and h['closes']:
+                    hours_by_date[date] = (h['opens'], h['closes'])
+        return hours_by_date
+
+    def _merge_resource_hours(self, unit_hours, resource_periods, begin, end):
+        """
+        Return the unit hours overridden by the periods set for a resource
+
+        Periods set for the resource always carry a higher priority, so they
+        decide the hours of every day they cover.
+        """
+        own_hours = self._get_hours_by_date(resource_periods, begin, end)
+        resource_hours = dict(unit_hours)
+        for period in resource_periods:
+            date = max(period.start, begin)
+            while date <= min(period.end, end):
+                if date in own_hours:
+                    resource_hours[date] = own_hours[date]
+                else:
+                    resource_hours.pop(date, None)
+                date += datetime.timedelta(days=1)
+        return resource_hours
 
     def get_tz(self):
         return pytz.timezone(self.time_zone)
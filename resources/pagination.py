@@ -1,4 +1,18 @@
-from rest_framework.pagination import PageNumberPagination, _positive_int
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import CursorPagination, PageNumberPagination, _positive_int
+
+
+def reverse_ordering(ordering):
+    """
+    Reverse the direction of every field of the ordering
+
+    :type ordering: tuple[str]
+    :rtype: tuple[str]
+    """
+    return tuple(order[1:] if order.startswith('-') else '-' + order for order in ordering)
 
 
 class DefaultPagination(PageNumberPagination):
@@ -7,11 +21,171 @@ class DefaultPagination(PageNumberPagination):
     max_page_size = 500
 
 
+class DefaultCursorPagination(CursorPagination):
+    """
+    Cursor pagination on a keyset of unique ordering fields
+
+    Unlike in the cursor pagination of DRF, which positions the cursor only by
+    the first ordering field and skips the objects with the same value with an
+    offset, the position contains the values of all the ordering fields. The
+    page is filtered to the objects after the position in the ordering, so the
+    cost of a page stays the same however many objects share the first value.
+
+    The ordering of the view is replaced by the keyset, so the query parameters
+    of unsupported_query_params, which order the results in some other way,
+    can't be used together with the cursor.
+    """
+    page_size = DefaultPagination.page_size
+    page_size_query_param = DefaultPagination.page_size_query_param
+    max_page_size = DefaultPagination.max_page_size
+    unsupported_query_params = ()
+    # the page number paginator whose page size rules are followed, see OptionalCursorPaginationMixin
+    page_size_paginator = None
+
+    def get_page_size(self, request):
+        if self.page_size_paginator is not None:
+            return self.page_size_paginator.get_page_size(request)
+        return super().get_page_size(request)
+
+    def get_ordering(self, request, queryset, view):
+        # The keyset is always used instead of the ordering of the view.
+        return self.ordering
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field_name = order.lstrip('-')
+            value = instance[field_name] if isinstance(instance, dict) else getattr(instance, field_name)
+            values.append(str(value))
+        return json.dumps(values)
+
+    def _get_keyset_filter(self, ordering, position):
+        """
+        Return a filter for the objects after the position in the ordering
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        # (a, b) > (x, y) is a > x OR (a = x AND b > y)
+        keyset_filter = Q()
+        equal = {}
+        for order, value in zip(ordering, values):
+            field_name = order.lstrip('-')
+            lookup = '__lt' if order.startswith('-') else '__gt'
+            keyset_filter |= Q(**equal) & Q(**{field_name + lookup: value})
+            equal[field_name] = value
+        return keyset_filter
+
+    def paginate_queryset(self, queryset, request, view=None):
+        for param in self.unsupported_query_params:
+            if param in request.query_params:
+                raise ParseError("'cursor' can't be used together with '%s'" % param)
+
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        ordering = reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self._get_keyset_filter(ordering, current_position))
+
+        # The positions are unique, so the offset is always 0 in the cursors
+        # made here. An extra object is fetched to see if there is a following page.
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            following_position = None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = following_position is not None
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+class OptionalCursorPaginationMixin(object):
+    """
+    Use cursor_pagination_class instead when the request has the cursor parameter
+
+    Cursor pagination doesn't count the objects and filters by the keyset
+    instead of using an offset, so the cost of a page doesn't grow when
+    walking deeper. An empty cursor parameter returns the first page.
+    """
+    cursor_pagination_class = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_pagination_class and 'cursor' in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            # the page size is chosen the same way with and without the cursor
+            self.cursor_paginator.page_size_paginator = self
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_paginator:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
+
+
 class PurposePagination(DefaultPagination):
     page_size = 40
 
 
-class ReservationPagination(DefaultPagination):
+class ResourceCursorPagination(DefaultCursorPagination):
+    ordering = ('id',)
+    # the search rank and distance orderings
+    unsupported_query_params = ('search', 'lat', 'lon')
+
+
+class ResourcePagination(OptionalCursorPaginationMixin, DefaultPagination):
+    cursor_pagination_class = ResourceCursorPagination
+
+
+class ReservationCursorPagination(DefaultCursorPagination):
+    ordering = ('begin', 'id')
+
+    def get_ordering(self, request, queryset, view):
+        if request.query_params.get('ordering') == '-begin':
+            return ('-begin', '-id')
+        return self.ordering
+
+
+class ReservationPagination(OptionalCursorPaginationMixin, DefaultPagination):
+    cursor_pagination_class = ReservationCursorPagination
+
     def get_page_size(self, request):
         if self.page_size_query_param:
             cutoff = self.max_page_size
@@ -0,0 +1,100 @@
+"""
+Process-local cache of reference data.
+
+The reservation metadata sets, resource types, equipment and terms of use
+change a few times a year but are needed on almost every request. They
+are kept in the memory of each process, and if RESPA_REFERENCE_DATA_CACHE_TIMEOUT
+is set, also in the Django cache so that a fresh worker doesn't have to load
+them from the database. Saving or deleting any of the models bumps the
+generation of the REFERENCE_DATA namespace, and every process reloads the
+data on its next access after seeing the new generation.
+
+Other processes see the new generation only with a shared cache. Without
+one, the data is kept in the memory of a process for at most
+RESPA_REFERENCE_DATA_MAX_AGE seconds.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import REFERENCE_DATA, get_generation, is_cache_shared, make_key
+from .models import Equipment, ReservationMetadataSet, ResourceType, TermsOfUse
+
+# name -> (generation, load time, data)
+_local_cache = {}
+
+
+def _load_reservation_metadata_sets():
+    queryset = ReservationMetadataSet.objects.prefetch_related('supported_fields', 'required_fields')
+    return {obj.id: obj for obj in queryset}
+
+
+def _load_resource_types():
+    return {obj.id: obj for obj in ResourceType.objects.all()}
+
+
+def _load_equipment():
+    queryset = Equipment.objects.select_related('category').prefetch_related('aliases')
+    return {obj.id: obj for obj in queryset}
+
+
+def _load_terms_of_use():
+    return {obj.id: obj for obj in TermsOfUse.objects.all()}
+
+
+LOADERS = {
+    'reservation_metadata_sets': _load_reservation_metadata_sets,
+    'resource_types': _load_resource_types,
+    'equipment': _load_equipment,
+    'terms_of_use': _load_terms_of_use,
+}
+
+
+def get_reference_data(name):
+    """
+    Return the reference data of the given name as a dict keyed by id
+
+    The returned objects are shared between requests and must not be
+    modified.
+
+    :type name: str
+    :rtype: dict
+    """
+    generation = get_generation(REFERENCE_DATA)
+    shared = is_cache_shared()
+    cached = _local_cache.get(name)
+    if cached is not None and cached[0] == generation:
+        max_age = getattr(settings, 'RESPA_REFERENCE_DATA_MAX_AGE', 60)
+        if shared or time.monotonic() - cached[1] < max_age:
+            return cached[2]
+
+    timeout = getattr(settings, 'RESPA_REFERENCE_DATA_CACHE_TIMEOUT', None) if shared else None
+    # The generations are read before loading and bumped only after the
+    # changes are committed, so stale data is never stored under a new
+    # generation.
+    key = make_key(REFERENCE_DATA, name) if timeout else None
+    data = cache.get(key) if key else None
+    if data is None:
+        data = LOADERS[name]()
+        if key:
+            cache.set(key, data, timeout)
+
+    _local_cache[name] = (generation, time.monotonic(), data)
+    return data
+
+
+def get_reservation_metadata_sets():
+    return get_reference_data('reservation_metadata_sets')
+
+
+def get_resource_types():
+    return get_reference_data('resource_types')
+
+
+def get_equipment():
+    return get_reference_data('equipment')
+
+
+def get_terms_of_use():
+    return get_reference_data('terms_of_use')
@@ -0,0 +1,130 @@
+"""
+Full-text search of resources.
+
+Every resource has a tsvector column per language that is built from its own
+name and description, the name and description of its unit and the names,
+aliases and descriptions of its equipment. The columns are rebuilt with raw
+SQL whenever any of those change, and the search matches the query against
+all the languages with their own text search configurations.
+"""
+import re
+from collections import OrderedDict
+
+from django.db import connection
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+from .models import Equipment, EquipmentAlias, Resource, ResourceEquipment, Unit
+
+# language -> PostgreSQL text search configuration
+SEARCH_CONFIGS = OrderedDict([
+    ('fi', 'finnish'),
+    ('sv', 'swedish'),
+    ('en', 'english'),
+])
+
+SEARCH_VECTOR_SQL = '''
+    setweight(to_tsvector('{config}', coalesce(r.name_{lang}, '')), 'A') ||
+    setweight(to_tsvector('{config}', concat_ws(' ', u.name_{lang}, eq.names_{lang})), 'B') ||
+    setweight(to_tsvector('{config}', concat_ws(' ', r.description_{lang}, u.description_{lang},
+                                               eq.descriptions_{lang})), 'C')
+'''
+
+EQUIPMENT_TEXT_SQL = '''
+    string_agg(concat_ws(' ', e.name_{lang}, e.name, (
+        SELECT string_agg(a.name, ' ') FROM {alias_table} a WHERE a.equipment_id = e.id AND a.language = '{lang}'
+    )), ' ') AS names_{lang},
+    string_agg(re.description_{lang}, ' ') AS descriptions_{lang}
+'''
+
+UPDATE_SEARCH_VECTORS_SQL = '''
+UPDATE {resource_table} AS target SET {assignments}
+FROM {resource_table} r
+LEFT JOIN {unit_table} u ON u.id = r.unit_id
+LEFT JOIN LATERAL (
+    SELECT {equipment_columns}
+    FROM {resource_equipment_table} re
+    JOIN {equipment_table} e ON e.id = re.equipment_id
+    WHERE re.resource_id = r.id
+) eq ON true
+WHERE target.id = r.id
+'''
+
+
+def get_update_search_vectors_sql():
+    langs = SEARCH_CONFIGS.items()
+    assignments = ', '.join(
+        'search_vector_%s = %s' % (lang, SEARCH_VECTOR_SQL.format(lang=lang, config=config))
+        for lang, config in langs
+    )
+    equipment_columns = ', '.join(
+        EQUIPMENT_TEXT_SQL.format(lang=lang, alias_table=EquipmentAlias._meta.db_table) for lang, config in langs
+    )
+    return UPDATE_SEARCH_VECTORS_SQL.format(
+        resource_table=Resource._meta.db_table,
+        unit_table=Unit._meta.db_table,
+        resource_equipment_table=ResourceEquipment._meta.db_table,
+        equipment_table=Equipment._meta.db_table,
+        assignments=assignments,
+        equipment_columns=equipment_columns,
+    )
+
+
+def update_search_vectors(resource_ids=None):
+    """
+    Rebuild the search vectors of the given resources, or all of them if None
+
+    :type resource_ids: list[str] | None
+    """
+    sql = get_update_search_vectors_sql()
+    params = []
+    if resource_ids is not None:
+        resource_ids = list(resource_ids)
+        if not resource_ids:
+            return
+        sql += ' AND r.id = ANY(%s)'
+        params.append(resource_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def get_prefix_tsquery(text):
+    """
+    Return a tsquery matching resources that have words starting with each word of the text
+
+    Only word characters are kept, so the result is safe to pass to to_tsquery().
+
+    :type text: str
+    :rtype: str
+    """
+    return ' & '.join('%s:*' % word for word in re.findall(r'\w+', text))
+
+
+def search_resources(queryset, text):
+    """
+    Filter the resources by a full-text search and order them by rank
+
+    The text is matched in every language, and the rank is the best rank of
+    the languages.
+
+    :type queryset: django.db.models.QuerySet
+    :type text: str
+    :rtype: django.db.models.QuerySet
+    """
+    tsquery = get_prefix_tsquery(text)
+    if not tsquery:
+        return queryset
+
+    table = Resource._meta.db_table
+    match_sql = 'SELECT id FROM %s WHERE %s' % (table, ' OR '.join(
+        "search_vector_%s @@ to_tsquery('%s', %%s)" % (lang, config) for lang, config in SEARCH_CONFIGS.items()
+    ))
+    rank_sql = 'greatest(%s)' % ', '.join(
+        "ts_rank(%s.search_vector_%s, to_tsquery('%s', %%s))" % (table, lang, config)
+        for lang, config in SEARCH_CONFIGS.items()
+    )
+    params = [tsquery] * len(SEARCH_CONFIGS)
+
+    queryset = queryset.filter(id__in=RawSQL(match_sql, params))
+    queryset = queryset.annotate(search_rank=RawSQL(rank_sql, params, output_field=FloatField()))
+    return queryset.order_by('-search_rank', 'id')
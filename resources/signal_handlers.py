@@ -0,0 +1,149 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from guardian.models import GroupObjectPermission, UserObjectPermission
+
+from resources.cache import PERMISSIONS, REFERENCE_DATA, RESOURCE_REPRESENTATION, RESOURCE_STATE, bump_generation
+from resources.models import (
+    Day, Equipment, EquipmentAlias, EquipmentCategory, Period, Purpose, Reservation, ReservationMetadataField,
+    ReservationMetadataSet, Resource, ResourceEquipment, ResourceImage, ResourceType, TermsOfUse, Unit
+)
+from resources.search import update_search_vectors
+from resources.signals import opening_hours_updated
+
+
+# Models that are a part of the cached resource representations
+RESOURCE_REPRESENTATION_MODELS = (
+    Resource, ResourceImage, ResourceEquipment, Purpose, TermsOfUse, Unit, ResourceType, Equipment,
+    ReservationMetadataSet,
+)
+
+
+def invalidate_resource_representations(sender, **kwargs):
+    bump_generation(RESOURCE_REPRESENTATION)
+    # Resources serialized before the change was committed may have been
+    # cached under the new generation, so it is bumped again after the commit.
+    transaction.on_commit(lambda: bump_generation(RESOURCE_REPRESENTATION))
+
+
+for model in RESOURCE_REPRESENTATION_MODELS:
+    post_save.connect(invalidate_resource_representations, sender=model,
+                      dispatch_uid='resource_representation_save_%s' % model.__name__)
+    post_delete.connect(invalidate_resource_representations, sender=model,
+                        dispatch_uid='resource_representation_delete_%s' % model.__name__)
+# The supported and required reservation extra fields of the metadata sets are
+# a part of the representations, too.
+# The opening hours are a part of the representations of units
+for model in (Period, Day):
+    post_save.connect(invalidate_resource_representations, sender=model,
+                      dispatch_uid='resource_representation_save_%s' % model.__name__)
+    post_delete.connect(invalidate_resource_representations, sender=model,
+                        dispatch_uid='resource_representation_delete_%s' % model.__name__)
+opening_hours_updated.connect(invalidate_resource_representations,
+                              dispatch_uid='resource_representation_opening_hours')
+for through in (Resource.purposes.through, Resource.groups.through, ReservationMetadataSet.supported_fields.through,
+                ReservationMetadataSet.required_fields.through):
+    m2m_changed.connect(invalidate_resource_representations, sender=through,
+                        dispatch_uid='resource_representation_m2m_%s' % through.__name__)
+
+
+# Models that change the per-request parts of resources and units
+RESOURCE_STATE_MODELS = (Reservation, Period, Day, UserObjectPermission, GroupObjectPermission)
+
+
+def invalidate_resource_state(sender, **kwargs):
+    bump_generation(RESOURCE_STATE)
+
+
+for model in RESOURCE_STATE_MODELS:
+    post_save.connect(invalidate_resource_state, sender=model,
+                      dispatch_uid='resource_state_save_%s' % model.__name__)
+    post_delete.connect(invalidate_resource_state, sender=model,
+                        dispatch_uid='resource_state_delete_%s' % model.__name__)
+for through in (get_user_model().favorite_resources.through, get_user_model().groups.through):
+    m2m_changed.connect(invalidate_resource_state, sender=through,
+                        dispatch_uid='resource_state_m2m_%s' % through.__name__)
+opening_hours_updated.connect(invalidate_resource_state, dispatch_uid='resource_state_opening_hours')
+
+
+# Models of the process-local reference data cache
+REFERENCE_DATA_MODELS = (
+    ReservationMetadataSet, ReservationMetadataField, ResourceType, Equipment, EquipmentAlias, EquipmentCategory,
+    TermsOfUse,
+)
+
+
+def invalidate_reference_data(sender, **kwargs):
+    bump_generation(REFERENCE_DATA)
+    # Other processes may have reloaded the data before the change was
+    # committed, so the generation is bumped again after the commit.
+    transaction.on_commit(lambda: bump_generation(REFERENCE_DATA))
+
+
+for model in REFERENCE_DATA_MODELS:
+    post_save.connect(invalidate_reference_data, sender=model,
+                      dispatch_uid='reference_data_save_%s' % model.__name__)
+    post_delete.connect(invalidate_reference_data, sender=model,
+                        dispatch_uid='reference_data_delete_%s' % model.__name__)
+for through in (ReservationMetadataSet.supported_fields.through, ReservationMetadataSet.required_fields.through):
+    m2m_changed.connect(invalidate_reference_data, sender=through,
+                        dispatch_uid='reference_data_m2m_%s' % through.__name__)
+
+
+# The search vectors of resources contain texts of their units and equipment
+@receiver(post_save, sender=Resource, dispatch_uid='resource_search_save')
+def handle_resource_search_save(sender, instance, **kwargs):
+    update_search_vectors([instance.pk])
+
+
+@receiver(post_save, sender=Unit, dispatch_uid='unit_search_save')
+def handle_unit_search_save(sender, instance, **kwargs):
+    update_search_vectors(Resource.objects.filter(unit=instance).values_list('id', flat=True))
+
+
+def update_equipment_search_vectors(equipment_id):
+    update_search_vectors(
+        ResourceEquipment.objects.filter(equipment=equipment_id).values_list('resource_id', flat=True).distinct()
+    )
+
+
+@receiver(post_save, sender=Equipment, dispatch_uid='equipment_search_save')
+def handle_equipment_search_save(sender, instance, **kwargs):
+    update_equipment_search_vectors(instance.pk)
+
+
+@receiver(post_save, sender=EquipmentAlias, dispatch_uid='equipment_alias_search_save')
+@receiver(post_delete, sender=EquipmentAlias, dispatch_uid='equipment_alias_search_delete')
+def handle_equipment_alias_search_change(sender, instance, **kwargs):
+    update_equipment_search_vectors(instance.equipment_id)
+
+
+@receiver(post_save, sender=ResourceEquipment, dispatch_uid='resource_equipment_search_save')
+@receiver(post_delete, sender=ResourceEquipment, dispatch_uid='resource_equipment_search_delete')
+def handle_resource_equipment_search_change(sender, instance, **kwargs):
+    update_search_vectors([instance.resource_id])
+
+
+@receiver(post_save, sender=Unit, dispatch_uid='unit_effective_location_save')
+def handle_unit_location_save(sender, instance, **kwargs):
+    # resources without a location of their own are located at their unit
+    Resource.objects.filter(unit=instance, location__isnull=True).update(effective_location=instance.location)
+
+
+def invalidate_permissions(sender, **kwargs):
+    bump_generation(PERMISSIONS)
+    # Matrices built before the change was committed may have been cached
+    # under the new generation, so it is bumped again after the commit.
+    transaction.on_commit(lambda: bump_generation(PERMISSIONS))
+
+
+for model in (UserObjectPermission, GroupObjectPermission):
+    post_save.connect(invalidate_permissions, sender=model,
+                      dispatch_uid='permissions_save_%s' % model.__name__)
+    post_delete.connect(invalidate_permissions, sender=model,
+                        dispatch_uid='permissions_delete_%s' % model.__name__)
+for through in (get_user_model().groups.through, get_user_model().user_permissions.through, Group.permissions.through):
+    m2m_changed.connect(invalidate_permissions, sender=through,
+                        dispatch_uid='permissions_m2m_%s' % through.__name__)
@@ -3,3 +3,4 @@ import django.dispatch
 reservation_confirmed = django.dispatch.Signal(providing_args=['instance', 'user'])
 reservation_modified = django.dispatch.Signal(providing_args=['instance', 'user'])
 reservation_cancelled = django.dispatch.Signal(providing_args=['instance', 'user'])
+opening_hours_updated = django.dispatch.Signal(providing_args=['resource_ids', 'begin', 'end'])
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import datetime
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from lpr_purchase import celery_app as app
+from resources.models import ResourceDailyOpeningHours, Unit
+
+logger = logging.getLogger(__name__)
+
+
+def update_opening_hours_horizon(begin, end, batch_size=None):
+    """
+    Materialize the opening hours of all the resources from begin to end
+
+    The resources of every unit are updated in batches of batch_size
+    resources, each in its own transaction, so that no lock is held for
+    longer than it takes to update a single batch.
+
+    :type begin: datetime.date
+    :type end: datetime.date
+    :type batch_size: int | None
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'RESPA_OPENING_HOURS_BATCH_SIZE', 1000)
+    for unit in Unit.objects.filter(resources__isnull=False).distinct():
+        resource_ids = list(unit.resources.order_by('id').values_list('id', flat=True))
+        for i in range(0, len(resource_ids), batch_size):
+            with transaction.atomic():
+                unit.update_opening_hours(begin, end, resource_ids=resource_ids[i:i + batch_size])
+
+
+def delete_in_batches(queryset, batch_size):
+    """
+    Delete the objects of the queryset in batches, each in its own transaction
+
+    Returns the number of objects deleted.
+
+    :type batch_size: int
+    :rtype: int
+    """
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted += queryset.model.objects.filter(id__in=ids).delete()[0]
+    return deleted
+
+
+def delete_old_opening_hours(before, batch_size):
+    """
+    Delete the materialized opening hours that have ended before the given time
+
+    :type before: datetime.datetime
+    :type batch_size: int
+    :rtype: int
+    """
+    return delete_in_batches(ResourceDailyOpeningHours.objects.filter(open_between__endswith__lte=before), batch_size)
+
+
+@app.task
+def maintain_opening_hours():
+    """
+    Keep the opening hours materialized for a rolling horizon and prune old ones
+    """
+    horizon_days = getattr(settings, 'RESPA_OPENING_HOURS_HORIZON_DAYS', 548)
+    retention_days = getattr(settings, 'RESPA_OPENING_HOURS_RETENTION_DAYS', 365)
+    batch_size = getattr(settings, 'RESPA_OPENING_HOURS_BATCH_SIZE', 1000)
+
+    today = timezone.localdate()
+    update_opening_hours_horizon(today, today + datetime.timedelta(days=horizon_days), batch_size)
+
+    if retention_days is not None:
+        before = timezone.now() - datetime.timedelta(days=retention_days)
+        deleted = delete_old_opening_hours(before, batch_size)
+        logger.info('Deleted %d opening hours that ended before %s', deleted, before)
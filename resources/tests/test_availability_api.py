@@ -0,0 +1,118 @@
+import datetime
+
+import pytest
+import pytz
+from django.core.urlresolvers import reverse
+
+from resources.api.availability import AvailabilityViewSet
+from resources.models import Day, Period, Reservation
+
+
+@pytest.fixture
+def list_url():
+    return reverse('availability-list')
+
+
+def _create_opening_hours(resource, opens, closes):
+    period = Period.objects.create(start=datetime.date(2115, 4, 1), end=datetime.date(2115, 4, 30),
+                                   resource=resource)
+    for weekday in range(0, 7):
+        Day.objects.create(period=period, weekday=weekday, opens=opens, closes=closes)
+    resource.update_opening_hours()
+
+
+@pytest.mark.django_db
+def test_availability_for_unit(api_client, list_url, user, resource_in_unit, test_unit):
+    _create_opening_hours(resource_in_unit, datetime.time(8, 0), datetime.time(16, 0))
+    Reservation.objects.create(
+        resource=resource_in_unit,
+        begin='2115-04-08T10:00:00+02:00',
+        end='2115-04-08T11:00:00+02:00',
+        user=user,
+    )
+
+    response = api_client.get(list_url, {
+        'unit': test_unit.id,
+        'start': '2115-04-08T00:00:00+02:00',
+        'end': '2115-04-10T00:00:00+02:00',
+    })
+    assert response.status_code == 200
+    assert len(response.data) == 1
+
+    data = response.data[0]
+    assert data['id'] == resource_in_unit.id
+    assert [day['date'] for day in data['days']] == ['2115-04-08', '2115-04-09']
+
+    first_day = data['days'][0]['free']
+    assert [(f['starts'].isoformat(), f['ends'].isoformat()) for f in first_day] == [
+        ('2115-04-08T08:00:00+02:00', '2115-04-08T10:00:00+02:00'),
+        ('2115-04-08T11:00:00+02:00', '2115-04-08T16:00:00+02:00'),
+    ]
+    assert len(data['days'][1]['free']) == 1
+
+
+@pytest.mark.django_db
+def test_availability_duration(api_client, list_url, user, resource_in_unit, resource_in_unit2):
+    for resource in (resource_in_unit, resource_in_unit2):
+        _create_opening_hours(resource, datetime.time(8, 0), datetime.time(16, 0))
+    Reservation.objects.create(
+        resource=resource_in_unit,
+        begin='2115-04-08T09:00:00+02:00',
+        end='2115-04-08T15:00:00+02:00',
+        user=user,
+    )
+
+    response = api_client.get(list_url, {
+        'resource': '%s,%s' % (resource_in_unit.id, resource_in_unit2.id),
+        'start': '2115-04-08T00:00:00+02:00',
+        'end': '2115-04-09T00:00:00+02:00',
+        'duration': 90,
+    })
+    assert response.status_code == 200
+
+    free_by_resource = {data['id']: data['days'][0]['free'] for data in response.data}
+    assert free_by_resource[resource_in_unit.id] == []
+    assert len(free_by_resource[resource_in_unit2.id]) == 1
+
+
+@pytest.mark.django_db
+def test_availability_required_parameters(api_client, list_url, resource_in_unit):
+    response = api_client.get(list_url, {'resource': resource_in_unit.id})
+    assert response.status_code == 400
+
+    response = api_client.get(list_url, {
+        'start': '2115-04-08T00:00:00+02:00',
+        'end': '2115-04-09T00:00:00+02:00',
+    })
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_availability_limits(api_client, list_url, resource_in_unit, settings):
+    settings.RESPA_AVAILABILITY_MAX_DAYS = 7
+    response = api_client.get(list_url, {
+        'resource': resource_in_unit.id,
+        'start': '2115-04-01T00:00:00+02:00',
+        'end': '2115-04-09T00:00:00+02:00',
+    })
+    assert response.status_code == 400
+
+    settings.RESPA_AVAILABILITY_MAX_RESOURCES = 0
+    response = api_client.get(list_url, {
+        'resource': resource_in_unit.id,
+        'start': '2115-04-01T00:00:00+02:00',
+        'end': '2115-04-02T00:00:00+02:00',
+    })
+    assert response.status_code == 400
+
+
+def test_availability_intervals_are_split_at_midnight():
+    tz = pytz.timezone('Europe/Helsinki')
+    starts = tz.localize(datetime.datetime(2115, 4, 8, 22, 0))
+    ends = tz.localize(datetime.datetime(2115, 4, 10, 2, 0))
+    parts = list(AvailabilityViewSet()._split_by_day(starts, ends, tz))
+    assert [(s.isoformat(), e.isoformat()) for s, e in parts] == [
+        ('2115-04-08T22:00:00+02:00', '2115-04-09T00:00:00+02:00'),
+        ('2115-04-09T00:00:00+02:00', '2115-04-10T00:00:00+02:00'),
+        ('2115-04-10T00:00:00+02:00', '2115-04-10T02:00:00+02:00'),
+    ]
@@ -0,0 +1,25 @@
+from django.core.cache import cache
+
+from resources.cache import RESOURCE_STATE, bump_generation, get_generation, get_generation_time, is_cache_shared
+
+
+def test_bump_generation():
+    cache.clear()
+    generation = get_generation(RESOURCE_STATE)
+    bump_generation(RESOURCE_STATE)
+    bump_generation(RESOURCE_STATE)
+    assert get_generation(RESOURCE_STATE) == generation + 2
+    assert get_generation_time(RESOURCE_STATE).timestamp() * 1000 >= generation
+
+    # an evicted generation is started again
+    cache.clear()
+    bump_generation(RESOURCE_STATE)
+    assert get_generation(RESOURCE_STATE) >= generation
+
+
+def test_is_cache_shared(settings):
+    settings.RESPA_SHARED_CACHE = None
+    # the default cache of the tests is process-local
+    assert is_cache_shared() is False
+    settings.RESPA_SHARED_CACHE = True
+    assert is_cache_shared() is True
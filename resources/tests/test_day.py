@@ -2,7 +2,7 @@ import datetime
 from datetime import date
 import pytest
 
-from resources.models import Period, Day
+from resources.models import Period, Day, Resource
 from .utils import assert_hours
 
 
@@ -95,3 +95,85 @@ def test_opening_hours(resource_in_unit):
     assert_hours(tz, hours, date(2015, 1, 1), '10:00', '14:00')
     assert_hours(tz, hours, date(2015, 1, 2), '10:00', '14:00')
     assert_hours(tz, hours, date(2015, 1, 3), None)
+
+
+@pytest.mark.django_db
+def test_update_opening_hours_for_date_range(resource_in_unit):
+    unit = resource_in_unit.unit
+    tz = unit.get_tz()
+
+    p1 = Period.objects.create(start=date(2015, 1, 1), end=date(2015, 12, 31),
+                               unit=unit, name='regular hours')
+    for weekday in range(0, 7):
+        Day.objects.create(period=p1, weekday=weekday,
+                           opens=datetime.time(8, 0),
+                           closes=datetime.time(18, 0))
+    resource_in_unit.update_opening_hours()
+    assert resource_in_unit.opening_hours.count() == 365
+    hours_ids = set(resource_in_unit.opening_hours.values_list('id', flat=True))
+
+    # Exception days added to the resource only change the rows on those days
+    p2 = Period.objects.create(start=date(2015, 6, 8), end=date(2015, 6, 9),
+                               resource=resource_in_unit, name='exception')
+    Day.objects.create(period=p2, weekday=0, opens=datetime.time(12, 0), closes=datetime.time(14, 0))
+    Day.objects.create(period=p2, weekday=1, closed=True)
+    resource_in_unit.update_opening_hours(date(2015, 6, 8), date(2015, 6, 9))
+
+    assert resource_in_unit.opening_hours.count() == 364
+    new_hours_ids = set(resource_in_unit.opening_hours.values_list('id', flat=True))
+    assert len(hours_ids - new_hours_ids) == 2
+    assert len(new_hours_ids - hours_ids) == 1
+
+    begin = tz.localize(datetime.datetime(2015, 6, 7))
+    hours = resource_in_unit.get_opening_hours(begin, begin + datetime.timedelta(days=3))
+    assert_hours(tz, hours, date(2015, 6, 7), '08:00', '18:00')
+    assert_hours(tz, hours, date(2015, 6, 8), '12:00', '14:00')
+    assert_hours(tz, hours, date(2015, 6, 9), None)
+    assert_hours(tz, hours, date(2015, 6, 10), '08:00', '18:00')
+
+    # A full update after a scoped one doesn't change anything
+    resource_in_unit.update_opening_hours()
+    assert set(resource_in_unit.opening_hours.values_list('id', flat=True)) == new_hours_ids
+
+
+@pytest.mark.django_db
+def test_unit_update_opening_hours(resource_in_unit, space_resource_type):
+    unit = resource_in_unit.unit
+    tz = unit.get_tz()
+    other_resource = Resource.objects.create(type=space_resource_type, name='other resource', unit=unit)
+
+    p1 = Period.objects.create(start=date(2015, 6, 1), end=date(2015, 6, 30),
+                               unit=unit, name='regular hours')
+    for weekday in range(0, 5):
+        Day.objects.create(period=p1, weekday=weekday,
+                           opens=datetime.time(8, 0),
+                           closes=datetime.time(18, 0))
+    p2 = Period.objects.create(start=date(2015, 6, 8), end=date(2015, 6, 14),
+                               resource=resource_in_unit, name='own hours')
+    Day.objects.create(period=p2, weekday=0, opens=datetime.time(12, 0), closes=datetime.time(14, 0))
+    Day.objects.create(period=p2, weekday=5, opens=datetime.time(10, 0), closes=datetime.time(12, 0))
+
+    unit.update_opening_hours()
+    begin = tz.localize(datetime.datetime(2015, 6, 1))
+    end = begin + datetime.timedelta(days=30)
+    hours = resource_in_unit.get_opening_hours(begin, end)
+    assert_hours(tz, hours, date(2015, 6, 5), '08:00', '18:00')
+    assert_hours(tz, hours, date(2015, 6, 8), '12:00', '14:00')
+    assert_hours(tz, hours, date(2015, 6, 9), None)
+    assert_hours(tz, hours, date(2015, 6, 13), '10:00', '12:00')
+    assert_hours(tz, hours, date(2015, 6, 15), '08:00', '18:00')
+    other_hours = other_resource.get_opening_hours(begin, end)
+    assert_hours(tz, other_hours, date(2015, 6, 8), '08:00', '18:00')
+    assert_hours(tz, other_hours, date(2015, 6, 13), None)
+
+    # The batch update gives the same hours as updating the resources one by one
+    for resource in (resource_in_unit, other_resource):
+        hours_ids = set(resource.opening_hours.values_list('id', flat=True))
+        resource.update_opening_hours()
+        assert set(resource.opening_hours.values_list('id', flat=True)) == hours_ids
+
+    # A scoped update only touches the given days
+    p1.delete()
+    unit.update_opening_hours(date(2015, 6, 1), date(2015, 6, 7))
+    assert resource_in_unit.opening_hours.count() == 14
+    assert other_resource.opening_hours.count() == 17
@@ -0,0 +1,62 @@
+import gzip
+import json
+
+import pytest
+from django.core.urlresolvers import reverse
+
+from resources.models import Reservation
+
+
+def _get_rows(response):
+    content = b''.join(response.streaming_content)
+    if response.get('Content-Encoding') == 'gzip':
+        content = gzip.decompress(content)
+    return [json.loads(line) for line in content.decode('utf8').splitlines()]
+
+
+@pytest.mark.django_db
+def test_export_is_staff_only(api_client, user_api_client):
+    for url in (reverse('reservation-export'), reverse('resource-export')):
+        assert api_client.get(url).status_code in (401, 403)
+        assert user_api_client.get(url).status_code == 403
+
+
+@pytest.mark.django_db
+def test_reservation_export(staff_api_client, user, resource_in_unit):
+    Reservation.objects.create(
+        resource=resource_in_unit, begin='2115-04-04T09:00:00+02:00', end='2115-04-04T10:00:00+02:00',
+        user=user, reserver_name='Test Reserver', state=Reservation.CONFIRMED
+    )
+    Reservation.objects.create(
+        resource=resource_in_unit, begin='2115-04-04T11:00:00+02:00', end='2115-04-04T12:00:00+02:00',
+        user=user, state=Reservation.CANCELLED
+    )
+
+    response = staff_api_client.get(reverse('reservation-export'))
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/x-ndjson'
+    rows = _get_rows(response)
+    # staff members see all the reservations
+    assert [row['state'] for row in rows] == [Reservation.CONFIRMED, Reservation.CANCELLED]
+    assert rows[0]['resource_id'] == resource_in_unit.id
+    assert rows[0]['user'] == str(user.uuid)
+    # but not the extra fields without the permission
+    assert 'reserver_name' not in rows[0]
+
+    response = staff_api_client.get(reverse('reservation-export'), HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Encoding'] == 'gzip'
+    assert len(_get_rows(response)) == 2
+
+
+@pytest.mark.django_db
+def test_resource_export(staff_api_client, resource_in_unit, resource_in_unit2):
+    resource_in_unit2.public = False
+    resource_in_unit2.save()
+
+    response = staff_api_client.get(reverse('resource-export'))
+    assert response.status_code == 200
+    rows = _get_rows(response)
+    assert {row['id'] for row in rows} == {resource_in_unit.id, resource_in_unit2.id}
+    row = next(row for row in rows if row['id'] == resource_in_unit.id)
+    assert row['name'] == {'fi': resource_in_unit.name_fi}
+    assert row['unit_id'] == resource_in_unit.unit_id
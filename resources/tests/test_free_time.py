@@ -0,0 +1,98 @@
+import datetime
+
+import pytest
+from django.core.exceptions import ValidationError
+
+from resources.free_time import sweep_free_intervals
+from resources.models import Day, Period, Reservation
+
+
+def _dt(hour, minute=0):
+    return datetime.datetime(2115, 4, 8, hour, minute)
+
+
+def test_sweep_free_intervals():
+    open_intervals = [(_dt(8), _dt(16)), (_dt(18), _dt(22))]
+    busy_intervals = [(_dt(15), _dt(19)), (_dt(7), _dt(9)), (_dt(10), _dt(11)), (_dt(10, 30), _dt(12))]
+
+    free = sweep_free_intervals(open_intervals, busy_intervals)
+    assert free == [(_dt(9), _dt(10)), (_dt(12), _dt(15)), (_dt(19), _dt(22))]
+
+    free = sweep_free_intervals(open_intervals, busy_intervals, duration=datetime.timedelta(hours=3))
+    assert free == [(_dt(12), _dt(15)), (_dt(19), _dt(22))]
+
+
+def test_sweep_free_intervals_fully_reserved():
+    assert sweep_free_intervals([(_dt(8), _dt(16))], [(_dt(6), _dt(18))]) == []
+    assert sweep_free_intervals([], [(_dt(6), _dt(18))]) == []
+    assert sweep_free_intervals([(_dt(8), _dt(16))], []) == [(_dt(8), _dt(16))]
+
+
+@pytest.mark.django_db
+def test_get_available_hours(resource_in_unit, user):
+    tz = resource_in_unit.unit.get_tz()
+    p1 = Period.objects.create(start=datetime.date(2115, 4, 1), end=datetime.date(2115, 4, 30),
+                               resource=resource_in_unit)
+    for weekday in range(0, 7):
+        Day.objects.create(period=p1, weekday=weekday, opens=datetime.time(8, 0), closes=datetime.time(16, 0))
+    resource_in_unit.update_opening_hours()
+
+    rv = Reservation.objects.create(resource=resource_in_unit, user=user,
+                                    begin=tz.localize(_dt(10)), end=tz.localize(_dt(12)))
+    Reservation.objects.create(resource=resource_in_unit, user=user, state=Reservation.CANCELLED,
+                               begin=tz.localize(_dt(13)), end=tz.localize(_dt(14)))
+
+    start = tz.localize(datetime.datetime(2115, 4, 8))
+    end = tz.localize(datetime.datetime(2115, 4, 10))
+    hours = resource_in_unit.get_available_hours(start, end)
+    assert [(h['starts'], h['ends']) for h in hours] == [
+        (tz.localize(_dt(8)), tz.localize(_dt(10))),
+        (tz.localize(_dt(12)), tz.localize(_dt(16))),
+        (tz.localize(datetime.datetime(2115, 4, 9, 8)), tz.localize(datetime.datetime(2115, 4, 9, 16))),
+    ]
+
+    hours = resource_in_unit.get_available_hours(start, end, duration=datetime.timedelta(hours=3))
+    assert len(hours) == 2
+    assert hours[0]['starts'] == tz.localize(_dt(12))
+
+    # the reservation being edited is disregarded
+    hours = resource_in_unit.get_available_hours(start, start + datetime.timedelta(days=1), reservation=rv)
+    assert [(h['starts'], h['ends']) for h in hours] == [(tz.localize(_dt(8)), tz.localize(_dt(16)))]
+
+    hours = resource_in_unit.get_available_hours(start, start + datetime.timedelta(days=1), during_closing=True)
+    assert [(h['starts'], h['ends']) for h in hours] == [
+        (start, tz.localize(_dt(10))),
+        (tz.localize(_dt(12)), start + datetime.timedelta(days=1)),
+    ]
+
+
+@pytest.mark.django_db
+def test_free_hours_agree_with_reservation_validation(resource_in_unit, user):
+    tz = resource_in_unit.unit.get_tz()
+    period = Period.objects.create(start=datetime.date(2115, 4, 1), end=datetime.date(2115, 4, 30),
+                                   resource=resource_in_unit)
+    for weekday in range(0, 7):
+        Day.objects.create(period=period, weekday=weekday, opens=datetime.time(8, 0), closes=datetime.time(16, 0))
+    resource_in_unit.update_opening_hours()
+    Reservation.objects.create(resource=resource_in_unit, user=user,
+                               begin=tz.localize(_dt(10)), end=tz.localize(_dt(12)))
+
+    start = tz.localize(datetime.datetime(2115, 4, 8))
+    hours = resource_in_unit.get_available_hours(start, start + datetime.timedelta(days=1))
+    free = [(h['starts'], h['ends']) for h in hours]
+    assert free == [(tz.localize(_dt(8)), tz.localize(_dt(10))), (tz.localize(_dt(12)), tz.localize(_dt(16)))]
+
+    def is_valid(begin, end):
+        reservation = Reservation(resource=resource_in_unit, user=user, begin=begin, end=end)
+        try:
+            reservation.clean()
+            resource_in_unit.validate_reservation_period(reservation, user)
+        except ValidationError:
+            return False
+        return True
+
+    # the free intervals can be reserved and the reserved and closed times can't
+    for begin, end in free:
+        assert is_valid(begin, min(end, begin + resource_in_unit.max_period))
+    assert not is_valid(tz.localize(_dt(9)), tz.localize(_dt(11)))
+    assert not is_valid(tz.localize(_dt(15)), tz.localize(_dt(17)))
@@ -0,0 +1,48 @@
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+MIGRATE_FROM = [('resources', '0076_auto_20200610_1657')]
+MIGRATE_TO = [('resources', '0078_reservation_overlap_constraint')]
+
+
+@pytest.fixture
+def migrate():
+    executor = MigrationExecutor(connection)
+
+    def migrate_to(targets):
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    yield migrate_to
+    migrate_to(executor.loader.graph.leaf_nodes())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_overlap_constraint_migration_denies_overlapping_reservations(migrate):
+    apps = migrate(MIGRATE_FROM)
+    Unit = apps.get_model('resources', 'Unit')
+    ResourceType = apps.get_model('resources', 'ResourceType')
+    Resource = apps.get_model('resources', 'Resource')
+    Reservation = apps.get_model('resources', 'Reservation')
+
+    unit = Unit.objects.create(id='migration_unit', name='unit', time_zone='Europe/Helsinki')
+    resource_type = ResourceType.objects.create(id='migration_type', name='type', main_type='space')
+    resource = Resource.objects.create(id='migration_resource', name='resource', unit=unit, type=resource_type,
+                                       authentication='none')
+
+    def create_reservation(begin, end, state='confirmed'):
+        return Reservation.objects.create(resource=resource, begin='2115-04-04T%s+02:00' % begin,
+                                          end='2115-04-04T%s+02:00' % end, state=state).id
+
+    first = create_reservation('09:00', '11:00')
+    overlapping = create_reservation('10:00', '12:00')
+    cancelled = create_reservation('09:30', '10:30', state='cancelled')
+    # overlaps only the denied reservation, so it is kept
+    after_denied = create_reservation('11:00', '12:30')
+
+    apps = migrate(MIGRATE_TO)
+    Reservation = apps.get_model('resources', 'Reservation')
+    states = dict(Reservation.objects.values_list('id', 'state'))
+    assert states == {first: 'confirmed', overlapping: 'denied', cancelled: 'cancelled', after_denied: 'confirmed'}
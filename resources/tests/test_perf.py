@@ -3,8 +3,11 @@ from datetime import datetime
 import arrow
 import pytest
 from django.conf import settings
+from modeltranslation.translator import translator
 
-from resources.models import Day, Period, Reservation, Resource, ResourceType, Unit
+from resources.api.base import LANGUAGES
+from resources.api.resource import ResourceSerializer
+from resources.models import Day, Period, Reservation, Resource, ResourceType, TermsOfUse, Unit
 
 TEST_PERFORMANCE = bool(getattr(settings, "TEST_PERFORMANCE", False))
 
@@ -87,3 +90,53 @@ def test_avail_resource_scalability(client):
         response = client.get('/test/availability?start_date=2015-06-01&end_date=2015-06-30')
         end = datetime.now()
         perf_res_list.write(str(n) + ', ' + str(end - start) + '\n')
+
+
+@pytest.mark.skipif(not TEST_PERFORMANCE, reason="TEST_PERFORMANCE not enabled")
+@pytest.mark.django_db
+def test_resource_serializer_setup(api_client, api_rf):
+    u1 = Unit.objects.create(name='Unit 1', id='unit_1', time_zone='Europe/Helsinki')
+    rt = ResourceType.objects.create(name='Type 1', id='type_1', main_type='space')
+    terms = TermsOfUse.objects.create(name='Terms 1', text_fi='ehdot', text_en='terms')
+    begin_res = arrow.get('2015-06-01T08:00:00Z').datetime
+    end_res = arrow.get('2015-06-01T16:00:00Z').datetime
+    for i in range(500):
+        resource = Resource.objects.create(name=('Resource ' + str(i)), id=('r' + str(i)), unit=u1, type=rt,
+                                           generic_terms=terms)
+        Reservation.objects.create(resource=resource, begin=begin_res, end=end_res)
+
+    perf_serializer = open('perf_serializer.csv', 'w')
+    perf_serializer.write('Resource serializer setup\n')
+    perf_serializer.write('case, time (s)\n')
+
+    # The setup of 500 serializers the way it was done before the translation
+    # plans were cached: the translated fields were looked up from the
+    # translator and the whole field map was built in __init__ ...
+    request = api_rf.get('/v1/resource/')
+    start = datetime.now()
+    for i in range(500):
+        serializer = ResourceSerializer(context={'request': request})
+        translated_fields = list(translator.get_options_for_model(Resource).fields.keys())
+        for field_name in translated_fields:
+            for lang in LANGUAGES:
+                serializer.fields.pop('%s_%s' % (field_name, lang), None)
+    end = datetime.now()
+    perf_serializer.write('500 serializers with per-instance setup, ' + str(end - start) + '\n')
+
+    # ... compared to the cached plan, with the field map built only when it is used
+    start = datetime.now()
+    for i in range(500):
+        ResourceSerializer(context={'request': request})
+    end = datetime.now()
+    perf_serializer.write('500 serializers with the cached plan, ' + str(end - start) + '\n')
+
+    # Serializing a full page
+    for lang in ('', 'fi'):
+        start = datetime.now()
+        response = api_client.get('/v1/resource/', {
+            'page_size': 500, 'start': '2015-06-01T08:00:00Z', 'end': '2015-06-01T16:00:00Z', 'lang': lang,
+        })
+        end = datetime.now()
+        assert response.status_code == 200
+        assert len(response.data['results']) == 500
+        perf_serializer.write('500 resources lang=%s, ' % lang + str(end - start) + '\n')
@@ -4,6 +4,7 @@ import pytest
 
 from django.core.exceptions import ValidationError
 from resources.models import Period, Day
+from resources.models.availability import resolve_period_days
 
 
 @pytest.mark.django_db
@@ -34,3 +35,17 @@ def test_invalid_belongings(space_resource, test_unit):
     with pytest.raises(ValidationError) as ei:
         period.clean()
     assert ei.value.code == "invalid_belonging"
+
+
+def test_resolve_period_days():
+    year = Period(start=date(2015, 1, 1), end=date(2015, 12, 31))
+    week = Period(start=date(2015, 6, 8), end=date(2015, 6, 14))
+    day = Period(start=date(2015, 6, 10), end=date(2015, 6, 10))
+    late = Period(start=date(2015, 6, 12), end=date(2016, 1, 31))
+
+    # periods earlier in the list take precedence
+    assigned = resolve_period_days([day, week, year], date(2015, 6, 7), date(2015, 6, 15))
+    assert assigned == [year, week, week, day, week, week, week, week, year]
+
+    assigned = resolve_period_days([late, week], date(2015, 6, 5), date(2015, 6, 13))
+    assert assigned == [None, None, None, week, week, week, week, late, late]
@@ -0,0 +1,41 @@
+import pytest
+
+from resources.models import ReservationMetadataField, ReservationMetadataSet
+from resources.reference_data import get_equipment, get_reservation_metadata_sets
+
+
+@pytest.mark.django_db
+def test_reference_data_follows_changes(equipment, equipment_alias):
+    cached = get_equipment()[equipment.id]
+    assert cached.name == 'test equipment'
+    assert [alias.name for alias in cached.aliases.all()] == ['test equipment alias']
+    # the data is not reloaded while nothing changes
+    assert get_equipment()[equipment.id] is cached
+
+    equipment.name = 'changed equipment'
+    equipment.save()
+    assert get_equipment()[equipment.id].name == 'changed equipment'
+
+    equipment_alias.delete()
+    assert list(get_equipment()[equipment.id].aliases.all()) == []
+
+
+@pytest.mark.django_db
+def test_reference_data_follows_m2m_changes():
+    metadata_set = ReservationMetadataSet.objects.create(name='test set')
+    assert list(get_reservation_metadata_sets()[metadata_set.id].supported_fields.all()) == []
+
+    field = ReservationMetadataField.objects.get(field_name='reserver_name')
+    metadata_set.supported_fields.add(field)
+    assert list(get_reservation_metadata_sets()[metadata_set.id].supported_fields.all()) == [field]
+
+
+@pytest.mark.django_db
+def test_reference_data_max_age_without_shared_cache(settings, equipment):
+    settings.RESPA_SHARED_CACHE = False
+    cached = get_equipment()[equipment.id]
+    assert get_equipment()[equipment.id] is cached
+
+    # other processes wouldn't see the generation change, so the data is reloaded after the max age
+    settings.RESPA_REFERENCE_DATA_MAX_AGE = 0
+    assert get_equipment()[equipment.id] is not cached
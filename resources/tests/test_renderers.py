@@ -0,0 +1,64 @@
+import datetime
+import decimal
+import json
+
+import msgpack
+import pytest
+import pytz
+from django.contrib.gis.geos import Point
+from django.utils.translation import ugettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from resources.api.renderers import FastJSONRenderer, MessagePackRenderer
+
+
+@pytest.fixture
+def data():
+    return {
+        'id': 'abc',
+        'begin': pytz.timezone('Europe/Helsinki').localize(datetime.datetime(2115, 4, 4, 9, 0, 0, 123456)),
+        'end': datetime.datetime(2115, 4, 4, 10, 0, tzinfo=pytz.utc),
+        'date': datetime.date(2115, 4, 4),
+        'price': decimal.Decimal('12.50'),
+        'label': ugettext_lazy('Resource'),
+        'location': Point(24.9, 60.2, srid=4326),
+        'results': [{'id': 1, 'name': None}],
+        'hours': {1: 'one'},
+    }
+
+
+def test_fast_json_renderer_matches_stock_renderer(data):
+    location = data.pop('location')
+    expected = json.loads(JSONRenderer().render(data).decode('utf8'))
+    assert json.loads(FastJSONRenderer().render(data).decode('utf8')) == expected
+    assert expected['end'] == '2115-04-04T10:00:00Z'
+
+    data['location'] = location
+    rendered = json.loads(FastJSONRenderer().render(data).decode('utf8'))
+    assert rendered['location'] == {'type': 'Point', 'coordinates': [24.9, 60.2]}
+
+
+def test_fast_json_renderer_indent(data):
+    data.pop('location')
+    rendered = FastJSONRenderer().render(data, 'application/json; indent=4')
+    assert rendered == JSONRenderer().render(data, 'application/json; indent=4')
+
+
+def test_msgpack_renderer(data):
+    location = data.pop('location')
+    expected = json.loads(JSONRenderer().render(data).decode('utf8'))
+    expected['hours'] = {1: 'one'}
+    data['location'] = location
+    expected['location'] = {'type': 'Point', 'coordinates': [24.9, 60.2]}
+
+    rendered = msgpack.unpackb(MessagePackRenderer().render(data), raw=False, strict_map_key=False)
+    assert rendered == expected
+
+
+@pytest.mark.django_db
+def test_msgpack_renderer_is_registered(api_client, resource_in_unit):
+    response = api_client.get('/v1/resource/', HTTP_ACCEPT='application/msgpack')
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/msgpack'
+    rendered = msgpack.unpackb(response.content, raw=False)
+    assert rendered['results'][0]['id'] == resource_in_unit.id
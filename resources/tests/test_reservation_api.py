@@ -1665,3 +1665,98 @@ def test_has_catering_order_field(user_api_client, user, user2, reservation, det
     response = user_api_client.get(detail_url)
     assert response.status_code == 200
     assert response.data['has_catering_order'] is False
+
+
+@pytest.mark.django_db
+def test_overlapping_reservation_is_rejected_by_the_database(api_client, user2, list_url, reservation,
+                                                             reservation_data, monkeypatch):
+    """
+    Tests that an overlapping reservation which gets past validation, like one made
+    concurrently with another, is rejected with the usual validation error.
+    """
+    monkeypatch.setattr(Resource, 'check_reservation_collision', lambda *args: False)
+    reservation_data['begin'] = '2115-04-04T09:30:00+02:00'
+    reservation_data['end'] = '2115-04-04T10:30:00+02:00'
+    api_client.force_authenticate(user=user2)
+
+    response = api_client.post(list_url, data=reservation_data, HTTP_ACCEPT_LANGUAGE='en')
+    assert response.status_code == 400
+    assert 'already reserved' in str(response.data)
+    assert Reservation.objects.count() == 1
+
+    # cancelled reservations don't block the time
+    reservation.state = Reservation.CANCELLED
+    reservation.save()
+    response = api_client.post(list_url, data=reservation_data, HTTP_ACCEPT_LANGUAGE='en')
+    assert response.status_code == 201
+
+
+@pytest.mark.django_db
+def test_reservation_cursor_pagination(api_client, list_url, resource_in_unit, user):
+    reservations = [
+        Reservation.objects.create(
+            resource=resource_in_unit,
+            begin='2115-04-0%dT09:00:00+02:00' % day,
+            end='2115-04-0%dT10:00:00+02:00' % day,
+            user=user,
+        ) for day in range(1, 6)
+    ]
+
+    url = list_url + '?cursor=&page_size=2'
+    ids = []
+    while url:
+        response = api_client.get(url)
+        assert response.status_code == 200
+        assert 'count' not in response.data
+        ids += [result['id'] for result in response.data['results']]
+        url = response.data['next']
+    assert ids == [reservation.id for reservation in reservations]
+
+    response = api_client.get(list_url + '?cursor=&page_size=2&ordering=-begin')
+    assert [result['id'] for result in response.data['results']] == [reservations[4].id, reservations[3].id]
+
+    # without the cursor, page numbers are used as before
+    response = api_client.get(list_url + '?page_size=2')
+    assert response.data['count'] == 5
+
+
+@pytest.mark.django_db
+def test_reservation_cursor_pagination_same_begin(api_client, list_url, resource_in_unit, resource_in_unit2,
+                                                   resource_in_unit3, user):
+    reservations = [
+        Reservation.objects.create(
+            resource=resource, begin='2115-04-04T09:00:00+02:00', end='2115-04-04T10:00:00+02:00', user=user,
+        ) for resource in (resource_in_unit, resource_in_unit2, resource_in_unit3)
+    ]
+    expected_ids = [reservation.id for reservation in sorted(reservations, key=lambda r: r.id)]
+
+    # the cursor is positioned by both the begin and the id
+    url = list_url + '?cursor=&page_size=1'
+    ids = []
+    while url:
+        response = api_client.get(url)
+        ids += [result['id'] for result in response.data['results']]
+        last_response = response
+        url = response.data['next']
+    assert ids == expected_ids
+
+    # and the previous pages are found the same way
+    url = last_response.data['previous']
+    while url:
+        response = api_client.get(url)
+        ids.append(response.data['results'][0]['id'])
+        url = response.data['previous']
+    assert ids == expected_ids + list(reversed(expected_ids[:-1]))
+
+
+@pytest.mark.django_db
+def test_reservation_sparse_fieldset(staff_api_client, list_url, reservation):
+    response = staff_api_client.get(list_url + '?fields=id,begin')
+    assert response.status_code == 200
+    assert set(response.data['results'][0].keys()) == {'id', 'begin'}
+
+    response = staff_api_client.get(list_url + '?omit=has_catering_order,purchase')
+    assert response.status_code == 200
+    keys = set(response.data['results'][0].keys())
+    assert 'id' in keys
+    assert not keys & {'has_catering_order', 'purchase'}
@@ -4,10 +4,11 @@ import pytest
 from django.core.files.base import ContentFile
 from django.core.exceptions import ValidationError
 from django.utils.translation import activate
+from guardian.shortcuts import assign_perm, remove_perm
 from PIL import Image
 
 from resources.errors import InvalidImage
-from resources.models import ResourceImage
+from resources.models import Resource, ResourceImage
 from resources.tests.utils import create_resource_image, get_test_image_data, get_field_errors
 
 
@@ -101,3 +102,24 @@ def test_price_validations(resource_in_unit):
         resource_in_unit.full_clean()
     assert 'Ensure this value is greater than or equal to 0.00.' in get_field_errors(ei.value, 'min_price_per_hour')
     assert 'Ensure this value is greater than or equal to 0.00.' in get_field_errors(ei.value, 'max_price_per_hour')
+
+
+@pytest.mark.django_db
+def test_permissions_follow_changes(resource_in_unit, resource_in_unit2, resource_group2, user, group):
+    assert not resource_in_unit.can_ignore_opening_hours(user)
+    assert list(Resource.objects.with_perm('can_ignore_opening_hours', user)) == []
+
+    assign_perm('unit:can_ignore_opening_hours', user, resource_in_unit.unit)
+    assert resource_in_unit.can_ignore_opening_hours(user)
+    assert not resource_in_unit2.can_ignore_opening_hours(user)
+    assert list(Resource.objects.with_perm('can_ignore_opening_hours', user)) == [resource_in_unit]
+
+    # permissions given to the user's groups through resource groups
+    assign_perm('group:can_ignore_opening_hours', group, resource_group2)
+    assert not resource_in_unit2.can_ignore_opening_hours(user)
+    user.groups.add(group)
+    assert resource_in_unit2.can_ignore_opening_hours(user)
+    assert set(Resource.objects.with_perm('can_ignore_opening_hours', user)) == {resource_in_unit, resource_in_unit2}
+
+    remove_perm('unit:can_ignore_opening_hours', user, resource_in_unit.unit)
+    assert not resource_in_unit.can_ignore_opening_hours(user)
@@ -189,6 +189,12 @@ def test_api_resource_geo_queries(api_client, resource_in_unit):
     assert results[0]['id'].endswith('r4')
     assert results[0]['distance'] == 53907
 
+    # Moving the unit moves the resources that inherit its location
+    unit.location = Point(24, 62, srid=4326)
+    unit.save()
+    response = api_client.get(url)
+    assert response.data['count'] == 0
+
 
 @pytest.mark.django_db
 def test_resource_favorite(staff_api_client, staff_user, resource_in_unit):
@@ -262,6 +268,196 @@ def test_is_favorite_field(api_client, staff_api_client, staff_user, resource_in
     assert response.data['is_favorite'] is True
 
 
+@pytest.mark.django_db
+def test_is_favorite_in_resource_list(list_url, user_api_client, user, resource_in_unit, resource_in_unit2):
+    user.favorite_resources.add(resource_in_unit2)
+
+    response = user_api_client.get(list_url)
+    assert response.status_code == 200
+    is_favorite = {data['id']: data['is_favorite'] for data in response.data['results']}
+    assert is_favorite == {resource_in_unit.id: False, resource_in_unit2.id: True}
+
+    response = user_api_client.get(list_url + '?is_favorite=false')
+    assert [data['id'] for data in response.data['results']] == [resource_in_unit.id]
+
+
+@pytest.mark.django_db
+def test_opening_hours_in_resource_list_in_different_time_zones(list_url, api_client, resource_in_unit,
+                                                                 resource_in_unit2):
+    resource_in_unit2.unit.time_zone = 'Europe/London'
+    resource_in_unit2.unit.save()
+    for resource in (resource_in_unit, resource_in_unit2):
+        period = Period.objects.create(start=datetime.date(2115, 4, 1), end=datetime.date(2115, 4, 30),
+                                       resource=resource)
+        Day.objects.create(period=period, weekday=3, opens=datetime.time(8, 0), closes=datetime.time(16, 0))
+        resource.update_opening_hours()
+
+    response = api_client.get(list_url + '?start=2115-04-04T00:00:00%2B02:00&end=2115-04-04T00:00:00%2B02:00')
+    assert response.status_code == 200
+    hours = {data['id']: data['opening_hours'] for data in response.data['results']}
+    expected = {resource_in_unit.id: '+02:00', resource_in_unit2.id: '+00:00'}
+    for resource_id, utc_offset in expected.items():
+        assert len(hours[resource_id]) == 1
+        assert hours[resource_id][0]['date'] == '2115-04-04'
+        assert hours[resource_id][0]['opens'].isoformat() == '2115-04-04T08:00:00' + utc_offset
+        assert hours[resource_id][0]['closes'].isoformat() == '2115-04-04T16:00:00' + utc_offset
+
+
+@pytest.mark.django_db
+def test_resource_search(list_url, api_client, resource_in_unit, resource_in_unit2, equipment_alias):
+    resource_in_unit.name_fi = 'Kokoushuone'
+    resource_in_unit.save()
+    resource_in_unit2.description_en = 'A meeting room with a view'
+    resource_in_unit2.save()
+
+    def search(text):
+        response = api_client.get(list_url, {'search': text})
+        assert response.status_code == 200
+        return [data['id'] for data in response.data['results']]
+
+    # prefixes of words match, and a match in the name ranks higher than in the description
+    assert search('kokous') == [resource_in_unit.id]
+    assert search('meeting') == [resource_in_unit2.id]
+    assert search('unit 2') == [resource_in_unit2.id]
+    assert search('nonexistent') == []
+
+    # texts of the related objects are kept up to date
+    resource_in_unit2.unit.name_fi = 'Kirjasto'
+    resource_in_unit2.unit.save()
+    assert search('kirjasto') == [resource_in_unit2.id]
+
+    ResourceEquipment.objects.create(resource=resource_in_unit, equipment=equipment_alias.equipment)
+    assert search('alias') == [resource_in_unit.id]
+    equipment_alias.delete()
+    assert search('alias') == []
+
+
+@pytest.mark.django_db
+def test_resource_representation_cache(api_client, staff_api_client, resource_in_unit, purpose, detail_url):
+    resource_in_unit.purposes.add(purpose)
+    response = api_client.get(detail_url)
+    assert response.status_code == 200
+    assert response.data['purposes'][0]['name'] == {'fi': 'test purpose'}
+    assert response.data['user_permissions']['is_admin'] is False
+
+    # the parts that depend on the user are not cached
+    response = staff_api_client.get(detail_url)
+    assert response.data['user_permissions']['is_admin'] is True
+
+    # changes to the related objects are seen right away
+    purpose.name_fi = 'changed purpose'
+    purpose.save()
+    response = api_client.get(detail_url)
+    assert response.data['purposes'][0]['name'] == {'fi': 'changed purpose'}
+
+    resource_in_unit.purposes.remove(purpose)
+    response = api_client.get(detail_url)
+    assert response.data['purposes'] == []
+
+
+@pytest.mark.django_db
+def test_resource_representation_cache_unit(api_client, staff_api_client, resource_in_unit, detail_url):
+    unit = resource_in_unit.unit
+    unit.reservable_days_in_advance = 10
+    unit.save()
+
+    # the unit of an admin request is not served to anonymous users
+    response = staff_api_client.get(detail_url)
+    assert response.data['unit']['reservable_before'] is None
+    response = api_client.get(detail_url)
+    assert response.data['unit']['reservable_before'] is not None
+
+    # and changes to the opening hours are seen right away
+    opening_hours_today = response.data['unit']['opening_hours_today']
+    today = timezone.localdate()
+    period = Period.objects.create(start=today, end=today, unit=unit, name='today')
+    Day.objects.create(period=period, weekday=today.weekday(), opens='06:13', closes='06:17')
+    response = api_client.get(detail_url)
+    assert response.data['unit']['opening_hours_today'] != opening_hours_today
+
+
+@pytest.mark.django_db
+def test_resource_conditional_get(settings, api_client, staff_api_client, user, resource_in_unit, list_url, detail_url):
+    response = api_client.get(detail_url)
+    assert response.status_code == 200
+    etag = response['ETag']
+    assert response['Last-Modified']
+
+    # without a shared cache the validators could be stale in other processes
+    settings.RESPA_SHARED_CACHE = False
+    assert 'ETag' not in api_client.get(detail_url)
+    settings.RESPA_SHARED_CACHE = True
+
+    response = api_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    # the validator depends on the user and the query string
+    response = staff_api_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    response = api_client.get(detail_url + '?start=2115-04-04T00:00:00%2B02:00&end=2115-04-05T00:00:00%2B02:00',
+                              HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+    response = api_client.get(list_url)
+    list_etag = response['ETag']
+    Reservation.objects.create(
+        resource=resource_in_unit,
+        begin='2115-04-04T09:00:00+02:00',
+        end='2115-04-04T10:00:00+02:00',
+        user=user,
+    )
+    response = api_client.get(list_url, HTTP_IF_NONE_MATCH=list_etag)
+    assert response.status_code == 200
+    response = api_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_resource_sparse_fieldset(api_client, resource_in_unit, list_url, detail_url):
+    response = api_client.get(list_url + '?fields=id,name')
+    assert response.status_code == 200
+    data = response.data['results'][0]
+    assert data['id'] == resource_in_unit.id
+    assert 'name' in data
+    for field_name in ('opening_hours', 'user_permissions', 'is_favorite', 'equipment', 'images'):
+        assert field_name not in data
+
+    response = api_client.get(detail_url + '?omit=opening_hours,user_permissions')
+    assert response.status_code == 200
+    assert 'opening_hours' not in response.data
+    assert 'user_permissions' not in response.data
+    assert response.data['unit']['id'] == resource_in_unit.unit.id
+
+    # the full representation is not affected by the cached sparse one
+    response = api_client.get(detail_url)
+    assert 'opening_hours' in response.data
+    assert 'user_permissions' in response.data
+
+
+@pytest.mark.django_db
+def test_resource_single_language(api_client, resource_in_unit, list_url, detail_url):
+    response = api_client.get(list_url + '?lang=en')
+    assert response.status_code == 200
+    data = response.data['results'][0]
+    assert data['specific_terms'] == 'specific terms of use'
+    # falls back to finnish
+    assert data['name'] == 'resource in unit'
+
+    response = api_client.get(detail_url + '?lang=sv')
+    assert response.status_code == 200
+    assert response.data['specific_terms'] == 'spesifiset käyttöehdot'
+    assert response.data['unit']['name'] == 'unit'
+
+    # the cached single language representation doesn't leak into the default one
+    response = api_client.get(list_url)
+    assert response.data['results'][0]['specific_terms'] == {
+        'fi': 'spesifiset käyttöehdot', 'en': 'specific terms of use'
+    }
+
+    response = api_client.get(list_url + '?lang=xx')
+    assert response.status_code == 400
+
+
 @pytest.mark.django_db
 def test_filtering_by_is_favorite(list_url, api_client, staff_api_client, staff_user, resource_in_unit,
                                   resource_in_unit2):
@@ -586,3 +782,91 @@ def test_resource_available_between_considers_inactive_reservations(user_api_cli
     response = user_api_client.get(list_url, params)
     assert response.status_code == 200
     assert_response_objects(response, [resource_in_unit])
+
+
+@pytest.mark.parametrize('filtering, expected_resource_indexes', (
+    ({}, [0, 1]),
+    ({'free_slot': '60,2115-04-08T08:00:00+02:00,2115-04-12T18:00:00+02:00'}, [0, 1]),
+    ({'free_slot': '120,2115-04-08T08:00:00+02:00,2115-04-12T18:00:00+02:00'}, [1]),
+    ({'free_slot': '120,2115-04-10T08:00:00+02:00,2115-04-10T18:00:00+02:00'}, []),
+    ({'free_slot': '60,2115-04-10T09:00:00+02:00,2115-04-10T11:00:00+02:00'}, [1]),
+    ({'free_slot': '60,2115-04-10T11:00:00+02:00,2115-04-10T12:00:00+02:00'}, [0]),
+))
+@pytest.mark.django_db
+def test_resource_free_slot_filter(user_api_client, list_url, user, resource_in_unit, resource_in_unit2,
+                                   filtering, expected_resource_indexes):
+    resources = (resource_in_unit, resource_in_unit2)
+
+    # resource 0 is open 8-12 on weekdays and has at most one free hour a day,
+    # resource 1 is open 12-16 on weekdays and 8-16 on wednesday the 10th
+    p1 = Period.objects.create(start=datetime.date(2115, 4, 1), end=datetime.date(2115, 4, 30),
+                               resource=resource_in_unit)
+    for weekday in range(0, 5):
+        Day.objects.create(period=p1, weekday=weekday, opens=datetime.time(8, 0), closes=datetime.time(12, 0))
+    p2 = Period.objects.create(start=datetime.date(2115, 4, 1), end=datetime.date(2115, 4, 30),
+                               resource=resource_in_unit2)
+    for weekday in range(0, 5):
+        opens = datetime.time(8, 0) if weekday == 2 else datetime.time(12, 0)
+        Day.objects.create(period=p2, weekday=weekday, opens=opens, closes=datetime.time(16, 0))
+    for resource in resources:
+        resource.update_opening_hours()
+
+    for day in range(8, 13):
+        Reservation.objects.create(
+            resource=resource_in_unit,
+            begin='2115-04-%02dT09:00:00+02:00' % day,
+            end='2115-04-%02dT11:00:00+02:00' % day,
+            user=user,
+        )
+    Reservation.objects.create(
+        resource=resource_in_unit2,
+        begin='2115-04-10T09:00:00+02:00',
+        end='2115-04-10T10:00:00+02:00',
+        user=user,
+    )
+    Reservation.objects.create(
+        resource=resource_in_unit2,
+        begin='2115-04-10T11:00:00+02:00',
+        end='2115-04-10T15:00:00+02:00',
+        user=user,
+    )
+    Reservation.objects.create(
+        resource=resource_in_unit2,
+        begin='2115-04-10T10:00:00+02:00',
+        end='2115-04-10T11:00:00+02:00',
+        user=user,
+        state=Reservation.CANCELLED,
+    )
+
+    response = user_api_client.get(list_url, filtering)
+    assert response.status_code == 200
+    assert_response_objects(response, [resources[index] for index in expected_resource_indexes])
+
+
+@pytest.mark.django_db
+def test_resource_free_slot_filter_constraints(user_api_client, list_url, resource_in_unit):
+    response = user_api_client.get(list_url, {'free_slot': '60,2115-04-08T00:00:00+02:00'})
+    assert response.status_code == 400
+
+    response = user_api_client.get(list_url, {
+        'free_slot': 'abc,2115-04-08T00:00:00+02:00,2115-04-09T00:00:00+02:00'
+    })
+    assert response.status_code == 400
+
+    response = user_api_client.get(list_url, {
+        'free_slot': '60,2115-04-09T00:00:00+02:00,2115-04-08T00:00:00+02:00'
+    })
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_resource_cursor_pagination(api_client, list_url, resource_in_unit, resource_in_unit2):
+    response = api_client.get(list_url + '?cursor=&page_size=1')
+    assert response.status_code == 200
+    assert response.data['results'][0]['id'] == min(resource_in_unit.id, resource_in_unit2.id)
+    assert response.data['next']
+
+    # the cursor would replace the search rank and distance orderings
+    for params in ('search=resource', 'lat=60.2&lon=24.9'):
+        response = api_client.get(list_url + '?cursor=&' + params)
+        assert response.status_code == 400
@@ -0,0 +1,46 @@
+import datetime
+
+import pytest
+
+from resources.models import Day, Period, Resource, ResourceDailyOpeningHours
+from resources.tasks import delete_old_opening_hours, update_opening_hours_horizon
+
+
+@pytest.mark.django_db
+def test_update_opening_hours_horizon(resource_in_unit):
+    period = Period.objects.create(start=datetime.date(2115, 1, 1), end=datetime.date(2115, 12, 31),
+                                   unit=resource_in_unit.unit)
+    for weekday in range(0, 7):
+        Day.objects.create(period=period, weekday=weekday, opens=datetime.time(8, 0), closes=datetime.time(16, 0))
+
+    update_opening_hours_horizon(datetime.date(2115, 3, 1), datetime.date(2115, 3, 31))
+    assert resource_in_unit.opening_hours.count() == 31
+
+
+@pytest.mark.django_db
+def test_update_opening_hours_horizon_in_batches(resource_in_unit):
+    resource2 = Resource.objects.create(name='resource 2', unit=resource_in_unit.unit, type=resource_in_unit.type)
+    period = Period.objects.create(start=datetime.date(2115, 1, 1), end=datetime.date(2115, 12, 31),
+                                   unit=resource_in_unit.unit)
+    for weekday in range(0, 7):
+        Day.objects.create(period=period, weekday=weekday, opens=datetime.time(8, 0), closes=datetime.time(16, 0))
+    ResourceDailyOpeningHours.objects.all().delete()
+
+    update_opening_hours_horizon(datetime.date(2115, 3, 1), datetime.date(2115, 3, 31), batch_size=1)
+    assert resource_in_unit.opening_hours.count() == 31
+    assert resource2.opening_hours.count() == 31
+
+
+@pytest.mark.django_db
+def test_delete_old_opening_hours(resource_in_unit):
+    tz = resource_in_unit.unit.get_tz()
+    period = Period.objects.create(start=datetime.date(2115, 4, 1), end=datetime.date(2115, 4, 10),
+                                   resource=resource_in_unit)
+    for weekday in range(0, 7):
+        Day.objects.create(period=period, weekday=weekday, opens=datetime.time(8, 0), closes=datetime.time(16, 0))
+    resource_in_unit.update_opening_hours()
+
+    deleted = delete_old_opening_hours(tz.localize(datetime.datetime(2115, 4, 6)), batch_size=2)
+    assert deleted == 5
+    first_hours = ResourceDailyOpeningHours.objects.order_by('open_between').first()
+    assert first_hours.open_between.lower == tz.localize(datetime.datetime(2115, 4, 6, 8))
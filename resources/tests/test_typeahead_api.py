@@ -3,6 +3,7 @@ import json
 
 import pytest
 from django.utils.crypto import get_random_string
+from django.utils import translation
 from django.utils.encoding import force_text
 
 from resources.api.search import TypeaheadViewSet
@@ -89,3 +90,44 @@ def test_typeahead_api_full_response(rf, typeahead_test_objects, typeahead_view)
     # Check that we get more data than with the non-full mode for resources:
     assert all(key in response_data["resource"][0] for key in ("id", "type", "name", "unit"))
     assert all(key in response_data["unit"][0] for key in ("id", "time_zone", "name", "phone"))
+
+
+@pytest.mark.django_db
+def test_typeahead_api_ordering_and_text(rf, typeahead_test_objects, typeahead_view, space_resource_type):
+    unit = typeahead_test_objects["unit"]
+    sauna = typeahead_test_objects["sauna"]
+    other_sauna = Resource.objects.create(
+        unit=unit, type=space_resource_type, authentication="none", name="Testiyksikön sauna ja kuntosali"
+    )
+
+    response = typeahead_view(request=rf.get("/", {"input": "testiyksikön sauna", "types": "resource"}))
+    response.render()
+    response_data = json.loads(force_text(response.content))
+    # the closest match comes first, and the text is the same as for the full objects
+    assert response_data["resource"] == [
+        {"id": sauna.id, "text": force_text(sauna)},
+        {"id": other_sauna.id, "text": force_text(other_sauna)},
+    ]
+
+    # changes are seen even though the results are cached
+    other_sauna.name_fi = "Kuntosali"
+    other_sauna.save()
+    response = typeahead_view(request=rf.get("/", {"input": "testiyksikön sauna", "types": "resource"}))
+    response.render()
+    response_data = json.loads(force_text(response.content))
+    assert [obj["id"] for obj in response_data["resource"]] == [sauna.id]
+
+
+@pytest.mark.django_db
+def test_typeahead_api_text_language(rf, typeahead_view):
+    unit = Unit.objects.create(name_fi="", name_sv="Bastuenhet", name_en="Bastu unit")
+
+    # the text is the same as str() in the active language, and each language is cached separately
+    for lang in ("sv", "en", "sv"):
+        with translation.override(lang):
+            response = typeahead_view(request=rf.get("/", {"input": "bastu", "types": "unit"}))
+            response.render()
+            response_data = json.loads(force_text(response.content))
+            assert response_data["unit"] == [{"id": unit.id, "text": force_text(unit)}]
+    with translation.override("en"):
+        assert force_text(unit).startswith("Bastu unit")
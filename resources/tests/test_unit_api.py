@@ -82,3 +82,21 @@ def test_resource_group_filter(api_client, test_unit, test_unit2, test_unit3, re
     response = api_client.get(list_url + '?' + 'resource_group=foobar')
     assert response.status_code == 200
     assert len(response.data['results']) == 0
+
+
+@pytest.mark.django_db
+def test_conditional_get(api_client, list_url, detail_url, test_unit):
+    for url in (list_url, detail_url):
+        response = api_client.get(url)
+        assert response.status_code == 200
+        etag = response['ETag']
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+
+    test_unit.name_fi = 'changed unit'
+    test_unit.save()
+    response = api_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
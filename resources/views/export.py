@@ -0,0 +1,145 @@
+"""
+Streaming NDJSON exports of resources and reservations for staff.
+
+The whole export is returned in one response. The rows are read from the
+database with a server-side cursor and written out in chunks, so the
+memory use doesn't depend on the size of the export.
+"""
+import re
+
+from django.conf import settings
+from django.db.models import BooleanField, Case, Q, Value, When
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+from helusers.jwt import JWTAuthentication
+from rest_framework import permissions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.views import APIView
+
+from resources.api.renderers import FastJSONRenderer, NDJSONRenderer, dumps_json
+from resources.api.reservation import USER_ID_ATTRIBUTE
+from resources.models import Reservation, Resource
+from resources.models.reservation import RESERVATION_EXTRA_FIELDS
+
+LANGUAGES = [x[0] for x in settings.LANGUAGES]
+
+# the same as in django.middleware.gzip
+re_accepts_gzip = re.compile(r'\bgzip\b')
+
+# number of rows written out at a time
+EXPORT_CHUNK_SIZE = 500
+
+RESOURCE_FIELDS = (
+    'id', 'unit_id', 'type_id', 'public', 'reservable', 'authentication', 'need_manual_confirmation',
+    'people_capacity', 'area', 'location', 'min_period', 'max_period', 'max_reservations_per_user',
+    'reservable_days_in_advance', 'min_price_per_hour', 'max_price_per_hour', 'created_at', 'modified_at',
+)
+RESOURCE_TRANSLATED_FIELDS = ('name', 'description')
+
+RESERVATION_FIELDS = (
+    'id', 'resource_id', 'begin', 'end', 'state', 'staff_event', 'created_at', 'modified_at',
+)
+
+
+def collect_translations(row, field_names):
+    """
+    Replace the per-language values of the fields in the row with {lang: value} dicts
+    """
+    for field_name in field_names:
+        values = {}
+        for lang in LANGUAGES:
+            val = row.pop('%s_%s' % (field_name, lang))
+            if val not in (None, ''):
+                values[lang] = val
+        row[field_name] = values or None
+    return row
+
+
+def stream_ndjson(rows):
+    """
+    Yield the rows as newline delimited JSON in chunks of EXPORT_CHUNK_SIZE rows
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(dumps_json(row))
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield b'\n'.join(chunk) + b'\n'
+            chunk = []
+    if chunk:
+        yield b'\n'.join(chunk) + b'\n'
+
+
+class NDJSONExportView(APIView):
+    """
+    Base class for the exports
+
+    The response is gzipped if the client accepts it.
+    """
+    authentication_classes = (JWTAuthentication, TokenAuthentication)
+    permission_classes = (permissions.IsAdminUser,)
+    renderer_classes = (NDJSONRenderer, FastJSONRenderer)
+    filename = None
+
+    def get_rows(self, user):
+        raise NotImplementedError()
+
+    def get(self, request, format=None):
+        content = stream_ndjson(self.get_rows(request.user))
+        gzipped = bool(re_accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+        if gzipped:
+            content = compress_sequence(content)
+
+        response = StreamingHttpResponse(content, content_type=NDJSONRenderer.media_type)
+        if gzipped:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        response['Content-Disposition'] = 'attachment; filename="%s"' % self.filename
+        return response
+
+
+class ResourceExportView(NDJSONExportView):
+    """
+    Export all the resources visible to the user as NDJSON
+    """
+    filename = 'resources.ndjson'
+
+    def get_rows(self, user):
+        translated_columns = ['%s_%s' % (f, lang) for f in RESOURCE_TRANSLATED_FIELDS for lang in LANGUAGES]
+        queryset = Resource.objects.visible_for(user).order_by('id')
+        rows = queryset.values(*(RESOURCE_FIELDS + tuple(translated_columns))).iterator()
+        for row in rows:
+            yield collect_translations(row, RESOURCE_TRANSLATED_FIELDS)
+
+
+class ReservationExportView(NDJSONExportView):
+    """
+    Export all the reservations visible to the user as NDJSON
+
+    The reservation extra fields are included only for the reservations
+    whose extra fields the user is allowed to see.
+    """
+    filename = 'reservations.ndjson'
+
+    def get_rows(self, user):
+        if user.is_superuser:
+            extra_fields_visible = Value(True, output_field=BooleanField())
+        else:
+            # the same rules as in ReservationQuerySet.extra_fields_visible()
+            allowed_resources = Resource.objects.with_perm('can_view_reservation_extra_fields', user)
+            extra_fields_visible = Case(
+                When(Q(user=user) | Q(resource__in=allowed_resources), then=Value(True)),
+                default=Value(False), output_field=BooleanField()
+            )
+
+        queryset = Reservation.objects.visible_for(user).order_by('begin', 'id')
+        queryset = queryset.annotate(extra_fields_visible=extra_fields_visible)
+        user_id_field = 'user__%s' % USER_ID_ATTRIBUTE
+        fields = RESERVATION_FIELDS + RESERVATION_EXTRA_FIELDS + (user_id_field, 'extra_fields_visible')
+
+        for row in queryset.values(*fields).iterator():
+            row['user'] = row.pop(user_id_field)
+            if not row.pop('extra_fields_visible'):
+                for field_name in RESERVATION_EXTRA_FIELDS:
+                    del row[field_name]
+            yield row
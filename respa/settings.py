@@ -25,7 +25,8 @@ env = environ.Env(
     MEDIA_URL=(str, '/media/'),
     STATIC_URL=(str, '/static/'),
     SENTRY_DSN=(str, ''),
-    COOKIE_PREFIX=(str, 'respa')
+    COOKIE_PREFIX=(str, 'respa'),
+    CACHE_URL=(str, 'locmemcache://'),
 )
 environ.Env.read_env()
 
@@ -40,6 +41,13 @@ DATABASES = {
 }
 DATABASES['default']['ATOMIC_REQUESTS'] = True
 
+# The generation based caches of resources, permissions and reference data
+# need a cache shared by all the processes, like memcached or redis, and are
+# turned off with the process-local default.
+CACHES = {
+    'default': env.cache()
+}
+
 SITE_ID = 1
 
 # Application definition
@@ -213,7 +221,15 @@ SOCIALACCOUNT_ADAPTER = 'helusers.adapter.SocialAccountAdapter'
 # REST Framework
 # http://www.django-rest-framework.org
 
+# Clients can ask for MessagePack with the Accept header
+API_RENDERER_CLASSES = (
+    'resources.api.renderers.FastJSONRenderer',
+    'rest_framework.renderers.BrowsableAPIRenderer',
+    'resources.api.renderers.MessagePackRenderer',
+)
+
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': API_RENDERER_CLASSES,
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
@@ -252,6 +268,27 @@ EMAIL_HOST_PASSWORD = ''
 RESPA_CATERINGS_ENABLED = False
 RESPA_COMMENTS_ENABLED = False
 RESPA_DOCX_TEMPLATE = os.path.join(BASE_DIR, 'reports', 'data', 'default.docx')
+# How many days ahead the opening hours are kept materialized, and for how
+# many days they are kept after they have ended (None keeps them forever)
+RESPA_OPENING_HOURS_HORIZON_DAYS = 548
+RESPA_OPENING_HOURS_RETENTION_DAYS = 365
+RESPA_OPENING_HOURS_BATCH_SIZE = 1000
+# Limits of a single request to the availability endpoint
+RESPA_AVAILABILITY_MAX_DAYS = 31
+RESPA_AVAILABILITY_MAX_RESOURCES = 100
+# How long the request-independent part of serialized resources is cached (0 disables)
+RESPA_RESOURCE_CACHE_TIMEOUT = 60 * 60
+# Whether the default cache is shared by all the processes (None checks the cache backend)
+RESPA_SHARED_CACHE = None
+# How long reference data, like equipment and metadata sets, is shared in the Django cache
+# (None keeps it only in the memory of each process)
+RESPA_REFERENCE_DATA_CACHE_TIMEOUT = 24 * 60 * 60
+# How long a process keeps using its copy of the reference data when the cache is not shared
+RESPA_REFERENCE_DATA_MAX_AGE = 60
+# How long non-full typeahead results are cached (0 disables)
+RESPA_TYPEAHEAD_CACHE_TIMEOUT = 60
+# How long the unit and resource group permissions of a user are cached (0 disables)
+RESPA_PERMISSION_CACHE_TIMEOUT = 60 * 60
 
 
 # local_settings.py can be used to override environment-specific settings
@@ -3,3 +3,6 @@ from .settings import *
 
 RESPA_CATERINGS_ENABLED = True
 RESPA_COMMENTS_ENABLED = True
+
+# the tests run in a single process
+RESPA_SHARED_CACHE = True
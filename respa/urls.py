@@ -23,6 +23,7 @@ from django.views.generic.base import RedirectView
 from resources.api import RespaAPIRouter
 from resources.views.images import ResourceImageView
 from resources.views.ical import ICalFeedView
+from resources.views.export import ReservationExportView, ResourceExportView
 from resources.views import testing as testing_views
 
 admin.autodiscover()
@@ -42,6 +43,8 @@ urlpatterns = [
     url(r'^accounts/', include('allauth.urls')),
     url(r'^grappelli/', include('grappelli.urls')),
     url(r'^resource_image/(?P<pk>\d+)$', ResourceImageView.as_view(), name='resource-image-view'),
+    url(r'^v1/export/reservations\.ndjson$', ReservationExportView.as_view(), name='reservation-export'),
+    url(r'^v1/export/resources\.ndjson$', ResourceExportView.as_view(), name='resource-export'),
     url(r'^v1/', include(router.urls)),
     url(r'^v1/reservation/ical/(?P<ical_token>[-\w\d]+).ics$', ICalFeedView.as_view(), name='ical-feed'),
     url(r'^$', RedirectView.as_view(url='v1/')),
@@ -6,12 +6,13 @@ import logging
 import iso8601
 
 from lxml import etree
+from django.db import IntegrityError
 from django.db.transaction import atomic
 from django.utils.timezone import now
 
 from sentry_sdk import configure_scope, push_scope, capture_message
 
-from resources.models.reservation import Reservation
+from resources.models.reservation import Reservation, is_reservation_overlap_error
 from respa_exchange.ews.calendar import GetCalendarItemsRequest, FindCalendarItemsRequest
 from respa_exchange.ews.user import ResolveNamesRequest
 from respa_exchange.ews.objs import ItemID
@@ -70,10 +71,31 @@ def _populate_reservation(reservation, ex_resource, item_props, ex_reservation=N
     reservation.comments = comment_text
 
 
+def _save_reservation(reservation, item_id):
+    """
+    Save a reservation synchronized from Exchange
+
+    Returns False if the reservation overlaps another reservation of the
+    resource, in which case the item is skipped without aborting the sync.
+
+    :rtype: bool
+    """
+    try:
+        with atomic():
+            reservation.save()
+    except IntegrityError as exc:
+        if not is_reservation_overlap_error(exc):
+            raise
+        log.warning("Skipping %s: it overlaps another reservation of %s", item_id, reservation.resource)
+        return False
+    return True
+
+
 def _update_reservation_from_exchange(item_id, ex_reservation, ex_resource, item_props):
     reservation = ex_reservation.reservation
     _populate_reservation(reservation, ex_resource, item_props, ex_reservation)
-    reservation.save()
+    if not _save_reservation(reservation, item_id):
+        return
     ex_reservation.item_id = item_id
     if not ex_reservation.managed_in_exchange:
         ex_reservation.organizer = item_props.get("organizer")
@@ -85,7 +107,8 @@ def _update_reservation_from_exchange(item_id, ex_reservation, ex_resource, item
 def _create_reservation_from_exchange(item_id, ex_resource, item_props):
     reservation = Reservation(resource=ex_resource.resource)
     _populate_reservation(reservation, ex_resource, item_props)
-    reservation.save()
+    if not _save_reservation(reservation, item_id):
+        return None
     ex_reservation = ExchangeReservation(
         exchange=ex_resource.exchange,
         principal_email=ex_resource.principal_email,
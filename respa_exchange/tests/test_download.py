@@ -12,13 +12,14 @@ from respa_exchange.tests.session import SoapSeller
 from respa_exchange.tests.utils import moments_close_enough
 
 
-def _generate_item_dict():
+def _generate_item_dict(start=None):
     item_id = ItemID(get_random_string(), get_random_string())
+    start = start or now()
     item_dict = {
         'id': item_id,
         'subject': get_random_string(),
-        'start': now(),
-        'end': now() + timedelta(hours=1),
+        'start': start,
+        'end': start + timedelta(hours=1),
         'organizer_name': 'Bob Dummy'
     }
     return item_dict
@@ -33,7 +34,8 @@ def test_download(
     email = "%s@example.com" % get_random_string()
     other_email = "%s@example.com" % get_random_string()
     item_dict = _generate_item_dict()
-    other_item_dict = _generate_item_dict()
+    # the reservations of a resource may not overlap
+    other_item_dict = _generate_item_dict(start=now() + timedelta(days=1))
     item_id = item_dict["id"]
     delegate = FindItemsHandler()
     delegate.add_item(email, item_dict)
@@ -80,3 +82,25 @@ def _check_imported_reservation(item_id, item_dict):
     assert moments_close_enough(ex.reservation.end, item_dict['end'])
 
     return ex
+
+
+@pytest.mark.django_db
+def test_download_skips_overlapping_items(settings, space_resource, exchange):
+    email = "%s@example.com" % get_random_string()
+    item_dict = _generate_item_dict()
+    overlapping_item_dict = _generate_item_dict(start=item_dict['start'] + timedelta(minutes=30))
+    delegate = FindItemsHandler()
+    delegate.add_item(email, item_dict)
+    delegate.add_item(email, overlapping_item_dict)
+
+    SoapSeller.wire(settings, delegate)
+    ex_resource = ExchangeResource.objects.create(
+        resource=space_resource,
+        principal_email=email,
+        exchange=exchange,
+        sync_to_respa=True
+    )
+
+    # the overlapping item is skipped without aborting the sync
+    sync_from_exchange(ex_resource)
+    assert ex_resource.reservations.count() == 1